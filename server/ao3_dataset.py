@@ -6,10 +6,16 @@ from typing import Dict, List, Any
 
 from datasets import load_dataset
 
+try:
+    from parquet_scan import find_shards, scan_author_rows
+except ImportError:  # pyarrow not installed: streaming only
+    find_shards = None
+
 DATASET_ID = os.getenv("AO3_DATASET_ID", "trentmkelly/archiveofourown-meta")
 TARGET_YEAR = int(os.getenv("AO3_YEAR", "2025"))
 MAX_MATCHES = int(os.getenv("AO3_MAX_MATCHES", "1000"))
 STREAMING = os.getenv("AO3_STREAMING", "1") == "1"
+PARQUET_SCAN = os.getenv("AO3_PARQUET_SCAN", "1") == "1"
 
 
 def to_year(value: Any):
@@ -53,10 +59,19 @@ def normalize_list(val: Any):
     return [str(val).strip()]
 
 
+def iter_rows(username: str):
+    """Rows to aggregate: a pushed-down Parquet scan when shards are cached locally,
+    otherwise the full dataset stream."""
+    shards = find_shards(DATASET_ID) if PARQUET_SCAN and find_shards else []
+    if shards:
+        return "parquet", scan_author_rows(shards, username, TARGET_YEAR)
+    return "streaming", load_dataset(DATASET_ID, split="train", streaming=STREAMING)
+
+
 def scrape_dataset(username: str):
     username_lower = username.lower()
     
-    dataset = load_dataset(DATASET_ID, split="train", streaming=STREAMING)
+    engine, dataset = iter_rows(username)
 
     fandom_counts: Dict[str, int] = {}
     relationship_counts: Dict[str, int] = {}
@@ -110,6 +125,7 @@ def scrape_dataset(username: str):
         "topCharacters": top_counts(character_counts),
         "dataset": DATASET_ID,
         "streaming": STREAMING,
+        "engine": engine,
         "maxMatches": MAX_MATCHES,
     }
 
@@ -0,0 +1,166 @@
+"""
+Shared HTTP transport for the AO3 scrapers.
+One keep-alive connection pool for the whole process (shared by per-thread
+sessions), compressed transfer encodings, a single retry/backoff policy that
+honours Retry-After, and a cap on concurrent connections per host.
+"""
+import atexit
+import os
+import random
+import sys
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+from urllib.parse import urlsplit
+
+BASE = "https://archiveofourown.org"
+TIMEOUT = 20
+ATTEMPTS = 3  # Total tries per request
+BACKOFF = 2  # Base delay (seconds), doubled per attempt
+MAX_BACKOFF = 60  # Upper bound for backoff and Retry-After waits
+HOST_CONNECTIONS = int(os.getenv("AO3_HOST_CONNECTIONS", "4"))  # Concurrent connections per host
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+REQUEST_BUDGET = int(os.getenv("AO3_REQUEST_BUDGET", "0"))  # Hard cap on requests per process, retries included (0 = none)
+REQUEST_COUNT_FILE = os.getenv("AO3_REQUEST_COUNT_FILE", "")  # Requests made are written here at exit
+
+try:
+    import brotli  # noqa: F401 - urllib3 only decodes br when this is installed
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
+
+_sessions = threading.local()
+_adapters = None  # URL prefix -> adapter, shared by every thread's session
+_session_lock = threading.Lock()
+_host_slots = {}
+_requests_made = 0
+
+
+class RequestBudgetExceeded(Exception):
+    """AO3_REQUEST_BUDGET is used up; the scrape must not be stored as complete."""
+
+
+def spend_request() -> None:
+    """Count one outgoing request against REQUEST_BUDGET."""
+    global _requests_made
+    with _session_lock:
+        if REQUEST_BUDGET and _requests_made >= REQUEST_BUDGET:
+            raise RequestBudgetExceeded(f"Request budget of {REQUEST_BUDGET} used up")
+        _requests_made += 1
+
+
+@atexit.register
+def write_request_count() -> None:
+    if REQUEST_COUNT_FILE:
+        with open(REQUEST_COUNT_FILE, "w", encoding="utf-8") as f:
+            f.write(str(_requests_made))
+
+
+def shared_adapters(session) -> dict:
+    """The process-wide pooled adapters, resized from the first session's own
+    (keeps cloudscraper's TLS cipher setup)."""
+    global _adapters
+    with _session_lock:
+        if _adapters is None:
+            for adapter in session.adapters.values():
+                adapter._pool_connections = HOST_CONNECTIONS
+                adapter._pool_maxsize = HOST_CONNECTIONS
+                adapter._pool_block = True
+                adapter.init_poolmanager(HOST_CONNECTIONS, HOST_CONNECTIONS, block=True)
+            _adapters = dict(session.adapters)
+    return _adapters
+
+
+def get_session():
+    """This thread's cloudscraper session.
+
+    CloudScraper keeps per-instance challenge state without a lock, so each
+    thread gets its own session; they all mount the same adapters, so
+    connections are still pooled and kept alive across threads.
+    """
+    session = getattr(_sessions, "session", None)
+    if session is None:
+        import cloudscraper  # Heavy (~100 ms); imported on first use to keep ao3_quick light
+        session = cloudscraper.create_scraper()
+        session.headers.update({"Accept-Encoding": ACCEPT_ENCODING, "Referer": BASE + "/"})
+        for prefix, adapter in shared_adapters(session).items():
+            session.mount(prefix, adapter)
+        _sessions.session = session
+    return session
+
+
+def host_slot(url: str) -> threading.BoundedSemaphore:
+    host = urlsplit(url).netloc
+    with _session_lock:
+        if host not in _host_slots:
+            _host_slots[host] = threading.BoundedSemaphore(HOST_CONNECTIONS)
+        return _host_slots[host]
+
+
+def retry_after(response) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, response=None) -> float:
+    delay = BACKOFF * (2 ** attempt) + random.uniform(0, 1)
+    if response is not None:
+        delay = max(delay, retry_after(response) or 0)
+    return min(delay, MAX_BACKOFF)
+
+
+def fetch(url: str, attempts: int = ATTEMPTS, timeout: float = TIMEOUT, tag: str = "HTTP", stream: bool = False,
+          deadline_at: Optional[float] = None):
+    """GET with retry/backoff on connection errors and 429/5xx.
+
+    Returns the last response (callers check status_code, e.g. 404), or None
+    if every attempt failed without one. With stream=True the body is left
+    unread; callers must consume or close() it. With `deadline_at` (a
+    time.time() value) socket timeouts and backoff waits are cut to the time
+    left, and no new attempt starts after it. Every attempt counts against
+    AO3_REQUEST_BUDGET; RequestBudgetExceeded is raised once it is used up.
+    """
+    session = get_session()
+    response = None
+    for attempt in range(attempts):
+        remaining = deadline_at - time.time() if deadline_at else None
+        if remaining is not None and remaining <= 0:
+            break
+        spend_request()
+        try:
+            with host_slot(url):
+                response = session.get(url, timeout=min(timeout, remaining or timeout), stream=stream)
+            if response.status_code not in RETRY_STATUSES:
+                return response
+            print(f"[{tag}] {response.status_code} for {url}", file=sys.stderr)
+            if attempt + 1 < attempts:
+                response.close()
+        except Exception as e:
+            response = None
+            print(f"[{tag}] Error: {e}", file=sys.stderr)
+        if attempt + 1 < attempts:
+            delay = backoff_delay(attempt, response)
+            if deadline_at:
+                delay = min(delay, max(0.0, deadline_at - time.time()))
+            time.sleep(delay)
+    return response
+
+
+def fetch_text(url: str, attempts: int = ATTEMPTS, timeout: float = TIMEOUT, tag: str = "HTTP",
+               deadline_at: Optional[float] = None) -> Optional[str]:
+    """Body of a 200 response, or None."""
+    response = fetch(url, attempts, timeout, tag, deadline_at=deadline_at)
+    if response is not None and response.status_code == 200:
+        return response.text
+    return None
@@ -4,18 +4,25 @@ Requires: python server/build_index.py (run once)
 """
 import json
 import os
+import sqlite3
 import sys
+from bisect import bisect_left
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 
-DATA_DIR = Path(__file__).parent / "data"
+DATA_DIR = Path(os.getenv("AO3_DATA_DIR", str(Path(__file__).parent / "data")))
 INDEX_FILE = DATA_DIR / "author_index.json"
 WORKS_FILE = DATA_DIR / "works.jsonl"
+YEARS_DIR = DATA_DIR / "years"
+AUTHOR_DB = DATA_DIR / "author_works.sqlite"
+DISTRIBUTIONS_FILE = "tag_distributions.json"  # written by build_distributions.py
 
 # In-memory cache
 _author_index: Dict[str, List[str]] = {}
 _works: Dict[str, dict] = {}
 _loaded = False
+_year_partitions: Dict[int, Tuple[Dict[str, List[str]], Dict[str, dict]]] = {}
+_distributions: Dict[Optional[int], dict] = {}
 
 def load_data():
     global _author_index, _works, _loaded
@@ -38,6 +45,63 @@ def load_data():
     
     _loaded = True
 
+def available_years() -> List[int]:
+    if not YEARS_DIR.exists():
+        return []
+    return sorted(int(p.name) for p in YEARS_DIR.iterdir() if p.name.isdigit())
+
+def load_year(year: int):
+    """Load one year's partition (author postings + works) without the full index."""
+    if year in _year_partitions:
+        return _year_partitions[year]
+    
+    index_file = YEARS_DIR / str(year) / "author_index.json"
+    works_file = YEARS_DIR / str(year) / "works.jsonl"
+    if not index_file.exists() or not works_file.exists():
+        raise FileNotFoundError(
+            f"No index partition for {year}. Run: python server/build_index.py\n"
+            f"Expected files:\n  {index_file}\n  {works_file}"
+        )
+    
+    with open(index_file, "r", encoding="utf-8") as f:
+        author_index = json.load(f)
+    works = {}
+    with open(works_file, "r", encoding="utf-8") as f:
+        for line in f:
+            work = json.loads(line)
+            works[work.get("id") or ""] = work
+    
+    _year_partitions[year] = (author_index, works)
+    return _year_partitions[year]
+
+def load_distributions(year: Optional[int] = None) -> dict:
+    """Per-tag quantile sketches; empty if build_distributions.py hasn't been run."""
+    if year not in _distributions:
+        path = (YEARS_DIR / str(year) if year is not None else DATA_DIR) / DISTRIBUTIONS_FILE
+        tags = {}
+        if path.exists():
+            with open(path, "r", encoding="utf-8") as f:
+                tags = json.load(f).get("tags", {})
+        _distributions[year] = tags
+    return _distributions[year]
+
+def percentile(points: List[int], value: int) -> int:
+    """Share of authors in the tag with a strictly smaller value (0-100)."""
+    return round(100 * bisect_left(points, value) / len(points))
+
+def add_percentiles(top: List[dict], words: Dict[str, int], sketches: dict) -> List[dict]:
+    for entry in top:
+        sketch = sketches.get(entry["name"])
+        if sketch:
+            entry["percentile"] = percentile(sketch["works"], entry["count"])
+            entry["wordsPercentile"] = percentile(sketch["words"], words.get(entry["name"], 0))
+    return top
+
+def add_words(totals: Dict[str, int], values: List[str], words: int):
+    for v in set(values):
+        if v:
+            totals[v] = totals.get(v, 0) + words
+
 def add_counts(counts: Dict[str, int], values: List[str]):
     for v in values:
         if v:
@@ -49,15 +113,22 @@ def top_counts(counts: Dict[str, int], limit: int = 10):
         for name, count in sorted(counts.items(), key=lambda x: x[1], reverse=True)[:limit]
     ]
 
-def get_user_stats(username: str):
-    load_data()
+def get_user_stats(username: str, year: Optional[int] = None):
+    """Aggregate a user's works; with `year`, only that year's partition is read."""
+    if year is None:
+        load_data()
+        author_index, works = _author_index, _works
+    else:
+        author_index, works = load_year(year)
     
     username_lower = username.lower().strip()
-    work_ids = _author_index.get(username_lower, [])
+    work_ids = author_index.get(username_lower, [])
+    scope = {"year": year} if year is not None else {}
     
     if not work_ids:
         return {
             "username": username,
+            **scope,
             "matchedWorks": 0,
             "totalWords": 0,
             "totalKudos": 0,
@@ -70,26 +141,67 @@ def get_user_stats(username: str):
     fandom_counts: Dict[str, int] = {}
     relationship_counts: Dict[str, int] = {}
     character_counts: Dict[str, int] = {}
+    tag_words: Dict[str, Dict[str, int]] = {"fandoms": {}, "relationships": {}, "characters": {}}
     total_words = 0
     
     for wid in work_ids:
-        work = _works.get(wid)
+        work = works.get(wid)
         if not work:
             continue
-        total_words += work.get("words", 0) or 0
+        words = work.get("words", 0) or 0
+        total_words += words
         add_counts(fandom_counts, work.get("fandoms", []))
         add_counts(relationship_counts, work.get("relationships", []))
         add_counts(character_counts, work.get("characters", []))
+        for kind, totals in tag_words.items():
+            add_words(totals, work.get(kind, []), words)
     
+    sketches = load_distributions(year)
     return {
         "username": username,
+        **scope,
         "matchedWorks": len(work_ids),
         "totalWords": total_words,
-        "topFandoms": top_counts(fandom_counts),
-        "topRelationships": top_counts(relationship_counts),
-        "topCharacters": top_counts(character_counts),
+        "topFandoms": add_percentiles(top_counts(fandom_counts), tag_words["fandoms"], sketches.get("fandoms", {})),
+        "topRelationships": add_percentiles(top_counts(relationship_counts), tag_words["relationships"], sketches.get("relationships", {})),
+        "topCharacters": add_percentiles(top_counts(character_counts), tag_words["characters"], sketches.get("characters", {})),
+    }
+
+def get_user_works(username: str) -> List[dict]:
+    """The user's indexed work records (id, words, tags, dates).
+
+    Reads only this author's rows from author_works.sqlite, so a short-lived
+    scraper process doesn't pay for loading the whole index.
+    """
+    if not AUTHOR_DB.exists():
+        raise FileNotFoundError(
+            f"Author lookup not found. Run: python server/build_index.py\n"
+            f"Expected file:\n  {AUTHOR_DB}"
+        )
+    conn = sqlite3.connect(f"{AUTHOR_DB.as_uri()}?mode=ro", uri=True)
+    try:
+        rows = conn.execute(
+            "SELECT data FROM author_works WHERE author = ? ORDER BY rowid", (username.lower().strip(),)
+        ).fetchall()
+    finally:
+        conn.close()
+    return [json.loads(data) for (data,) in rows]
+
+def compare_years(username: str, years: List[int]):
+    """Per-year stats side by side; each year touches only its own partition."""
+    return {
+        "username": username,
+        "years": [get_user_stats(username, year) for year in years],
     }
 
+def parse_years(argv: List[str]) -> List[int]:
+    for i, arg in enumerate(argv):
+        if arg.startswith("--year="):
+            return [int(y) for y in arg.split("=", 1)[1].split(",") if y]
+        if arg == "--year" and i + 1 < len(argv):
+            return [int(y) for y in argv[i + 1].split(",") if y]
+    return []
+
 if __name__ == "__main__":
     if len(sys.argv) < 2:
         print(json.dumps({"error": "username required"}))
@@ -97,7 +209,17 @@ if __name__ == "__main__":
     
     username = sys.argv[1]
     try:
-        result = get_user_stats(username)
+        years = parse_years(sys.argv[2:])
+        missing = sorted(set(years) - set(available_years()))
+        if missing:
+            raise FileNotFoundError(
+                f"No index partition for {', '.join(map(str, missing))}. "
+                f"Available years: {', '.join(map(str, available_years())) or 'none'}"
+            )
+        if len(years) > 1:
+            result = compare_years(username, years)
+        else:
+            result = get_user_stats(username, years[0] if years else None)
         print(json.dumps(result))
     except FileNotFoundError as e:
         print(json.dumps({"error": str(e)}))
@@ -3,56 +3,48 @@ AO3 Profile Scraper - Optimized with parallel requests and retry logic.
 Accepts up to 10% page loss for speed.
 """
 import json
+import os
 import sys
 import time
 import math
-import cloudscraper
+import random
+from collections import Counter
+from datetime import datetime
 from bs4 import BeautifulSoup
-from concurrent.futures import ThreadPoolExecutor, as_completed
-import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeout
+
+import ao3_http
+import ao3_quick
+import checkpoints
+import result_store
 
 # Configuration
-TIMEOUT = 20
 MAX_PAGES = 50
 PARALLEL_REQUESTS = 3  # How many pages to fetch at once
-RETRY_DELAY = 2  # Base delay for retries
 MAX_RETRIES = 2  # Fewer retries per page for speed, we'll do a second pass
 ACCEPTABLE_LOSS = 0.10  # 10% acceptable page loss
+HYBRID = os.getenv("AO3_HYBRID", "1") == "1"  # Use the local index (author_works.sqlite, if built) for authored works
+APPROX_PAGE_BUDGET = int(os.getenv("AO3_APPROX_PAGES", "30"))  # Default page budget for approximate mode
+Z_95 = 1.96  # Two-sided 95% confidence
 
-# Thread-safe session creation
-_sessions = threading.local()
-
-def get_session():
-    """Get or create a thread-local cloudscraper session."""
-    if not hasattr(_sessions, 'session'):
-        _sessions.session = cloudscraper.create_scraper()
-    return _sessions.session
 
+def scrape_profile_stats(username: str, deadline_at: float = None) -> dict:
+    """Scrape the user's dashboard and profile pages to get counts + joined date.
 
-def scrape_profile_stats(username: str) -> dict:
-    """Scrape the user's dashboard and profile pages to get counts + joined date."""
+    With `deadline_at`, both fetches stop at the deadline (see ao3_http.fetch).
+    """
     import re
-    session = get_session()
     
     url = f"https://archiveofourown.org/users/{username}"
     print(f"[PROFILE] Fetching dashboard: {url}", file=sys.stderr)
     
-    response = None
-    for attempt in range(3):
-        try:
-            response = session.get(url, timeout=TIMEOUT)
-            print(f"[PROFILE] Status: {response.status_code}", file=sys.stderr)
-            if response.status_code == 200:
-                break
-            if response.status_code == 503:
-                time.sleep(RETRY_DELAY * (attempt + 1))
-        except Exception as e:
-            print(f"[PROFILE] Error: {e}", file=sys.stderr)
-            time.sleep(RETRY_DELAY)
+    response = ao3_http.fetch(url, tag="PROFILE", deadline_at=deadline_at)
+    if response is not None:
+        print(f"[PROFILE] Status: {response.status_code}", file=sys.stderr)
     
     stats = {"works": 0, "bookmarks": 0, "series": 0, "collections": 0, "gifts": 0, "joined": ""}
     
-    if response and response.status_code == 200:
+    if response is not None and response.status_code == 200:
         soup = BeautifulSoup(response.text, 'html.parser')
         dashboard = soup.select_one("#dashboard")
         if dashboard:
@@ -73,22 +65,17 @@ def scrape_profile_stats(username: str) -> dict:
                         stats["gifts"] = count
         
         print(f"[PROFILE] Found: works={stats['works']}, bookmarks={stats['bookmarks']}", file=sys.stderr)
-    elif response and response.status_code == 404:
+    elif response is not None and response.status_code == 404:
         return None
 
     # Fetch joined date from the public profile page (retry on 503)
     profile_url = f"https://archiveofourown.org/users/{username}/profile"
     try:
-        profile_resp = None
-        for attempt in range(3):
-            profile_resp = session.get(profile_url, timeout=TIMEOUT)
+        profile_resp = ao3_http.fetch(profile_url, tag="PROFILE", deadline_at=deadline_at)
+        if profile_resp is not None:
             print(f"[PROFILE] Profile status: {profile_resp.status_code}", file=sys.stderr)
-            if profile_resp.status_code == 200:
-                break
-            if profile_resp.status_code == 503:
-                time.sleep(RETRY_DELAY * (attempt + 1))
 
-        if profile_resp and profile_resp.status_code == 200:
+        if profile_resp is not None and profile_resp.status_code == 200:
             profile_soup = BeautifulSoup(profile_resp.text, 'html.parser')
 
             # Primary: meta definition list
@@ -127,30 +114,18 @@ def scrape_profile_stats(username: str) -> dict:
                     print("[PROFILE] Joined not found. No meta blocks matched.", file=sys.stderr)
             else:
                 print(f"[PROFILE] Joined parsed: {stats['joined']}", file=sys.stderr)
+    except ao3_http.RequestBudgetExceeded:
+        raise
     except Exception as e:
         print(f"[PROFILE] Joined parse error: {e}", file=sys.stderr)
     
     return stats
 
 
-def fetch_single_page(url: str, page_num: int, page_type: str) -> tuple:
+def fetch_single_page(url: str, page_num: int, page_type: str, deadline_at: float = None) -> tuple:
     """Fetch a single page. Returns (page_num, html_content, success)."""
-    session = get_session()
-    
-    for attempt in range(MAX_RETRIES):
-        try:
-            response = session.get(url, timeout=TIMEOUT)
-            if response.status_code == 200:
-                return (page_num, response.text, True)
-            if response.status_code == 503:
-                time.sleep(RETRY_DELAY * (attempt + 1))
-            elif response.status_code == 404:
-                return (page_num, None, False)
-        except Exception as e:
-            print(f"[{page_type}] Page {page_num} error: {e}", file=sys.stderr)
-            time.sleep(RETRY_DELAY)
-    
-    return (page_num, None, False)
+    html = ao3_http.fetch_text(url, attempts=MAX_RETRIES, tag=f"{page_type} p{page_num}", deadline_at=deadline_at)
+    return (page_num, html, html is not None)
 
 
 def parse_bookmark(el) -> dict:
@@ -175,9 +150,22 @@ def parse_bookmark(el) -> dict:
         return None
 
 
+def parse_blurb_date(el) -> str:
+    """Blurb date ("12 Jan 2025") as an ISO date, matching the local index."""
+    date = el.select_one("p.datetime")
+    if not date:
+        return None
+    try:
+        return datetime.strptime(date.text.strip(), "%d %b %Y").date().isoformat()
+    except ValueError:
+        return None
+
+
 def parse_work(el) -> dict:
     """Parse a work element into structured data."""
     try:
+        work_id = (el.get("id") or "").replace("work_", "") or None
+        
         title = el.select_one("h4.heading a")
         title = title.text.strip() if title else "Unknown"
         
@@ -195,7 +183,9 @@ def parse_work(el) -> dict:
         characters = [c.text for c in el.select("li.characters a.tag")]
         
         return {
+            "id": work_id,
             "title": title,
+            "updated": parse_blurb_date(el),
             "words": words,
             "kudos": kudos,
             "hits": hits,
@@ -207,10 +197,60 @@ def parse_work(el) -> dict:
         return None
 
 
-def scrape_bookmarks_parallel(username: str, total_bookmarks: int) -> list:
+PAGE_PARSERS = {
+    "bookmarks": ("li.bookmark.blurb", parse_bookmark),
+    "works": ("li.work.blurb", parse_work),
+}
+
+
+def parse_page(html: str, kind: str) -> list:
+    selector, parse = PAGE_PARSERS[kind]
+    soup = BeautifulSoup(html, 'html.parser')
+    return [r for r in (parse(el) for el in soup.select(selector)) if r]
+
+
+def fetch_pages(username: str, kind: str, pages, checkpoint: dict = None) -> tuple:
+    """Fetch and parse listing pages in parallel, reusing checkpointed pages.
+
+    Returns ({page: records}, [failed pages]). Each parsed page is recorded
+    in the checkpoint as soon as it arrives.
+    """
+    tag = kind.upper()
+    page_records = {}
+    todo = []
+    for page in pages:
+        saved = checkpoints.saved_page(checkpoint, kind, page) if checkpoint else None
+        if saved is not None:
+            page_records[page] = saved
+        else:
+            todo.append(page)
+    if page_records:
+        print(f"[{tag}] {len(page_records)} pages restored from checkpoint", file=sys.stderr)
+    
+    failed_pages = []
+    with ThreadPoolExecutor(max_workers=PARALLEL_REQUESTS) as executor:
+        futures = {
+            executor.submit(fetch_single_page, f"https://archiveofourown.org/users/{username}/{kind}?page={p}", p, tag): p
+            for p in todo
+        }
+        
+        for future in as_completed(futures):
+            page_num, html, success = future.result()
+            if success and html:
+                page_records[page_num] = parse_page(html, kind)
+                if checkpoint:
+                    checkpoints.record_page(checkpoint, kind, page_num, page_records[page_num])
+                print(f"[{tag}] Page {page_num} ✓", file=sys.stderr)
+            else:
+                failed_pages.append(page_num)
+                print(f"[{tag}] Page {page_num} ✗", file=sys.stderr)
+    
+    return page_records, failed_pages
+
+
+def scrape_bookmarks_parallel(username: str, total_bookmarks: int, checkpoint: dict = None) -> list:
     """Scrape bookmarks using parallel requests with retry for failed pages."""
     bookmarks = []
-    failed_pages = []
     
     # Calculate how many pages we need
     per_page = 20  # AO3 shows 20 per page
@@ -218,25 +258,12 @@ def scrape_bookmarks_parallel(username: str, total_bookmarks: int) -> list:
     max_acceptable_failures = math.ceil(total_pages * ACCEPTABLE_LOSS)
     
     print(f"[BOOKMARKS] Need {total_pages} pages, max {max_acceptable_failures} failures OK", file=sys.stderr)
-    
-    # Build list of URLs to fetch
-    urls = [(f"https://archiveofourown.org/users/{username}/bookmarks?page={p}", p) for p in range(1, total_pages + 1)]
+    if checkpoint:
+        checkpoints.start_kind(checkpoint, "bookmarks", total_pages, total_bookmarks)
     
     # First pass: parallel fetch
     print(f"[BOOKMARKS] Starting parallel fetch ({PARALLEL_REQUESTS} at a time)...", file=sys.stderr)
-    page_results = {}
-    
-    with ThreadPoolExecutor(max_workers=PARALLEL_REQUESTS) as executor:
-        futures = {executor.submit(fetch_single_page, url, page, "BOOKMARKS"): page for url, page in urls}
-        
-        for future in as_completed(futures):
-            page_num, html, success = future.result()
-            if success and html:
-                page_results[page_num] = html
-                print(f"[BOOKMARKS] Page {page_num} ✓", file=sys.stderr)
-            else:
-                failed_pages.append(page_num)
-                print(f"[BOOKMARKS] Page {page_num} ✗ (will retry)", file=sys.stderr)
+    page_results, failed_pages = fetch_pages(username, "bookmarks", range(1, total_pages + 1), checkpoint)
     
     # Second pass: retry failed pages sequentially (to avoid rate limiting)
     if failed_pages and len(failed_pages) <= max_acceptable_failures * 2:
@@ -247,13 +274,18 @@ def scrape_bookmarks_parallel(username: str, total_bookmarks: int) -> list:
             url = f"https://archiveofourown.org/users/{username}/bookmarks?page={page}"
             page_num, html, success = fetch_single_page(url, page, "RETRY")
             if success and html:
-                page_results[page_num] = html
+                page_results[page_num] = parse_page(html, "bookmarks")
+                if checkpoint:
+                    checkpoints.record_page(checkpoint, "bookmarks", page_num, page_results[page_num])
                 failed_pages.remove(page)
                 print(f"[RETRY] Page {page} ✓", file=sys.stderr)
             else:
                 print(f"[RETRY] Page {page} still failed", file=sys.stderr)
             time.sleep(1)  # Gentle delay between retries
     
+    if checkpoint:
+        checkpoints.save(checkpoint)
+    
     # Check if we have acceptable coverage
     success_rate = len(page_results) / total_pages if total_pages > 0 else 1
     print(f"[BOOKMARKS] Got {len(page_results)}/{total_pages} pages ({success_rate*100:.1f}%)", file=sys.stderr)
@@ -261,19 +293,14 @@ def scrape_bookmarks_parallel(username: str, total_bookmarks: int) -> list:
     if success_rate < (1 - ACCEPTABLE_LOSS):
         print(f"[WARNING] Below acceptable threshold, some stats may be incomplete", file=sys.stderr)
     
-    # Parse all successful pages
     for page_num in sorted(page_results.keys()):
-        soup = BeautifulSoup(page_results[page_num], 'html.parser')
-        for bm in soup.select("li.bookmark.blurb"):
-            bm_data = parse_bookmark(bm)
-            if bm_data:
-                bookmarks.append(bm_data)
+        bookmarks.extend(page_results[page_num])
     
     print(f"[BOOKMARKS] Parsed {len(bookmarks)} bookmarks", file=sys.stderr)
     return bookmarks
 
 
-def scrape_works_parallel(username: str, total_works: int) -> list:
+def scrape_works_parallel(username: str, total_works: int, checkpoint: dict = None) -> list:
     """Scrape works using parallel requests."""
     works = []
     
@@ -284,29 +311,98 @@ def scrape_works_parallel(username: str, total_works: int) -> list:
     total_pages = min(math.ceil(total_works / per_page), MAX_PAGES)
     
     print(f"[WORKS] Need {total_pages} pages", file=sys.stderr)
+    if checkpoint:
+        checkpoints.start_kind(checkpoint, "works", total_pages, total_works)
     
-    urls = [(f"https://archiveofourown.org/users/{username}/works?page={p}", p) for p in range(1, total_pages + 1)]
-    page_results = {}
-    
-    with ThreadPoolExecutor(max_workers=PARALLEL_REQUESTS) as executor:
-        futures = {executor.submit(fetch_single_page, url, page, "WORKS"): page for url, page in urls}
-        
-        for future in as_completed(futures):
-            page_num, html, success = future.result()
-            if success and html:
-                page_results[page_num] = html
+    page_results, _ = fetch_pages(username, "works", range(1, total_pages + 1), checkpoint)
+    if checkpoint:
+        checkpoints.save(checkpoint)
     
     for page_num in sorted(page_results.keys()):
-        soup = BeautifulSoup(page_results[page_num], 'html.parser')
-        for work in soup.select("li.work.blurb"):
-            work_data = parse_work(work)
-            if work_data:
-                works.append(work_data)
+        works.extend(page_results[page_num])
     
     print(f"[WORKS] Parsed {len(works)} works", file=sys.stderr)
     return works
 
 
+def load_indexed_works(username: str) -> list:
+    """The user's works from the local index (ao3_local), or [] if unavailable."""
+    try:
+        import ao3_local
+        if not ao3_local.AUTHOR_DB.exists():
+            return []
+        indexed = ao3_local.get_user_works(username)
+    except Exception as e:
+        print(f"[HYBRID] Local index unavailable: {e}", file=sys.stderr)
+        return []
+    
+    # Same shape as parse_work; the index has no kudos/hits (None, not 0, so
+    # calculate_stats leaves these works out of engagement totals)
+    return [
+        {
+            "id": str(w.get("id")) if w.get("id") is not None else None,
+            "title": w.get("title") or "Unknown",
+            "updated": w.get("updated"),
+            "words": w.get("words", 0) or 0,
+            "kudos": None,
+            "hits": None,
+            "fandoms": w.get("fandoms", []),
+            "relationships": w.get("relationships", []),
+            "characters": w.get("characters", []),
+        }
+        for w in indexed
+    ]
+
+
+def scrape_works_hybrid(username: str, total_works: int, indexed: list, checkpoint: dict = None) -> tuple:
+    """Scrape only the newest /works pages not already covered by the local index.
+
+    AO3 lists works by last update, so pages are fetched front to back and we
+    stop at the first page whose works are all indexed and unchanged, as long
+    as live + indexed works account for the dashboard count.
+    Returns (merged works, number taken from the index).
+    """
+    per_page = 20
+    total_pages = min(math.ceil(total_works / per_page), MAX_PAGES)
+    indexed_by_id = {w["id"]: w for w in indexed if w.get("id")}
+    live = {}
+    
+    print(f"[HYBRID] {len(indexed_by_id)} works in local index, up to {total_pages} pages live", file=sys.stderr)
+    if checkpoint:
+        checkpoints.start_kind(checkpoint, "works", total_pages, total_works)
+    
+    page = 1
+    covered = False
+    while page <= total_pages and not covered:
+        batch = range(page, min(page + PARALLEL_REQUESTS, total_pages + 1))
+        page_results, _ = fetch_pages(username, "works", batch, checkpoint)
+        
+        for page_num in sorted(page_results):
+            page_works = page_results[page_num]
+            known = True
+            for work in page_works:
+                key = work.get("id") or f"page{page_num}:{work['title']}"
+                live[key] = work
+                cached = indexed_by_id.get(work.get("id"))
+                if not cached or (work.get("updated") or "") > (cached.get("updated") or ""):
+                    known = False
+            
+            merged_ids = set(live) | set(indexed_by_id)
+            if page_works and known and len(merged_ids) >= total_works:
+                print(f"[HYBRID] Page {page_num} fully indexed, stopping live scrape", file=sys.stderr)
+                covered = True
+                break
+        
+        page = batch[-1] + 1
+    
+    if checkpoint:
+        checkpoints.save(checkpoint)
+    
+    from_index = [w for wid, w in indexed_by_id.items() if wid not in live]
+    print(f"[HYBRID] {len(live)} works live, {len(from_index)} from index", file=sys.stderr)
+    return list(live.values()) + from_index, len(from_index)
+
+
 def calculate_stats(username: str, works: list, bookmarks: list, profile_stats: dict) -> dict:
     """Calculate aggregate stats from scraped data."""
     
@@ -342,6 +438,9 @@ def calculate_stats(username: str, works: list, bookmarks: list, profile_stats:
             char_counts[c] = char_counts.get(c, 0) + 1
     top_characters = [{"name": k, "count": v} for k, v in sorted(char_counts.items(), key=lambda x: -x[1])[:10]]
     
+    # Kudos/hits are only known for works scraped live (hybrid index works have None)
+    live_works = [w for w in works if w.get("kudos") is not None]
+    
     return {
         "username": username,
         "url": f"https://archiveofourown.org/users/{username}",
@@ -361,42 +460,17 @@ def calculate_stats(username: str, works: list, bookmarks: list, profile_stats:
         "topRelationships": top_relationships,
         "totalWordsRead": sum(b.get("words", 0) for b in bookmarks),
         "totalWordsWritten": sum(w.get("words", 0) for w in works),
-        "totalKudos": sum(w.get("kudos", 0) for w in works),
-        "totalHits": sum(w.get("hits", 0) for w in works),
-        "mostPopularWork": max(works, key=lambda w: w.get("kudos", 0)) if works else None,
+        "totalKudos": sum(w.get("kudos") or 0 for w in live_works),
+        "totalHits": sum(w.get("hits") or 0 for w in live_works),
+        "mostPopularWork": max(live_works, key=lambda w: w.get("kudos") or 0) if live_works else None,
+        # How many works the kudos/hits/mostPopularWork figures cover
+        "engagementCoverage": {"works": len(live_works), "of": len(works)},
     }
 
 
 def scrape_quick(username: str) -> dict:
-    """Quick scrape - just dashboard stats, instant."""
-    profile_stats = scrape_profile_stats(username)
-    
-    if profile_stats is None:
-        return {"error": f"User '{username}' not found"}
-    
-    return {
-        "username": username,
-        "url": f"https://archiveofourown.org/users/{username}",
-        "icon": "",
-        "header": "",
-        "joined": profile_stats.get("joined", ""),
-        "bio": None,
-        "bioHtml": None,
-        "works": profile_stats.get("works", 0),
-        "series": profile_stats.get("series", 0),
-        "bookmarks": profile_stats.get("bookmarks", 0),
-        "collections": profile_stats.get("collections", 0),
-        "gifts": profile_stats.get("gifts", 0),
-        "topFandoms": [],
-        "topCharacters": [],
-        "topRelationships": [],
-        "totalWordsRead": 0,
-        "totalWordsWritten": 0,
-        "totalKudos": 0,
-        "totalHits": 0,
-        "mostPopularWork": None,
-        "isQuickData": True,
-    }
+    """Quick scrape - just dashboard stats, instant (see ao3_quick)."""
+    return ao3_quick.scrape_quick(username)
 
 
 def scrape_full(username: str) -> dict:
@@ -410,11 +484,205 @@ def scrape_full(username: str) -> dict:
     total_bookmarks = profile_stats.get("bookmarks", 0)
     total_works = profile_stats.get("works", 0)
     
+    # Resume from a previous run that was killed before finishing
+    checkpoints.gc()
+    checkpoint = checkpoints.load(username)
+    
     # Parallel scrape
-    bookmarks = scrape_bookmarks_parallel(username, total_bookmarks) if total_bookmarks > 0 else []
-    works = scrape_works_parallel(username, total_works) if total_works > 0 else []
+    bookmarks = scrape_bookmarks_parallel(username, total_bookmarks, checkpoint) if total_bookmarks > 0 else []
+    
+    indexed = load_indexed_works(username) if HYBRID and total_works > 0 else []
+    works_from_index = 0
+    if indexed:
+        works, works_from_index = scrape_works_hybrid(username, total_works, indexed, checkpoint)
+    else:
+        works = scrape_works_parallel(username, total_works, checkpoint) if total_works > 0 else []
+    
+    result = calculate_stats(username, works, bookmarks, profile_stats)
+    result["worksFromIndex"] = works_from_index
+    checkpoints.clear(username)
+    return result
+
+
+def sample_pages(total_pages: int, budget: int) -> list:
+    """One random page from each of `budget` near-equal strata over 1..total_pages.
+
+    Returns (page, weight) pairs; the weight is the width of the page's
+    stratum, i.e. how many pages it stands for.
+    """
+    if budget >= total_pages:
+        return [(p, 1) for p in range(1, total_pages + 1)]
+    strata = [(1 + h * total_pages // budget, (h + 1) * total_pages // budget) for h in range(budget)]
+    return [(random.randint(first, last), last - first + 1) for first, last in strata]
+
+
+def fetch_sampled(tasks: list, deadline_at: float = None) -> dict:
+    """Fetch (kind, page, url) tasks in parallel until done or the deadline passes.
+
+    Tasks are shuffled first, so whatever finishes before the deadline is
+    still spread across the whole page range.
+    """
+    random.shuffle(tasks)
+    results = {}
+    executor = ThreadPoolExecutor(max_workers=PARALLEL_REQUESTS)
+    futures = {
+        executor.submit(fetch_single_page, url, page, kind, deadline_at): (kind, page)
+        for kind, page, url in tasks
+    }
+    try:
+        timeout = max(0, deadline_at - time.time()) if deadline_at else None
+        for future in as_completed(futures, timeout=timeout):
+            _, html, success = future.result()
+            if success and html:
+                results[futures[future]] = html
+    except FuturesTimeout:
+        print(f"[APPROX] Deadline reached with {len(results)}/{len(tasks)} pages", file=sys.stderr)
+    finally:
+        # In-flight fetches share deadline_at, so their threads end close to it
+        executor.shutdown(wait=False, cancel_futures=True)
+    return results
+
+
+def estimate_total(per_page: list, weights: list, total_pages: int) -> dict:
+    """Scale per-page sample sums to the whole range with a 95% interval.
+
+    Each sampled page stands for `weight` pages (its stratum width); the sum
+    is scaled by total_pages / sum(weights) so strata missed at the deadline
+    don't bias it low. The variance is the SRS-style variance of that
+    weighted mean with finite population correction, conservative for the
+    stratified sample. With fewer than two sampled pages (and not every page
+    read) there is no variance to go on: bounds are None, available False.
+    """
+    n = len(per_page)
+    covered = sum(weights)
+    if total_pages == 0 or (n == total_pages and covered == total_pages):
+        # Nothing to estimate, or every page was read
+        exact = sum(per_page)
+        return {"estimate": exact, "low": exact, "high": exact, "available": True}
+    if n == 0:
+        return {"estimate": None, "low": None, "high": None, "available": False}
+    mean = sum(w * v for w, v in zip(weights, per_page)) / covered
+    est = total_pages * mean
+    if n < 2:
+        return {"estimate": round(est), "low": None, "high": None, "available": False}
+    var = n / (n - 1) * sum((w / covered) ** 2 * (v - mean) ** 2 for w, v in zip(weights, per_page))
+    se = total_pages * math.sqrt(max(0.0, 1 - n / total_pages) * var)
+    return {
+        "estimate": round(est),
+        "low": max(sum(per_page), round(est - Z_95 * se)),  # Never below what we actually saw
+        "high": round(est + Z_95 * se),
+        "available": True,
+    }
+
+
+def estimate_top(pages: list, weights: list, key: str, total_pages: int, limit: int = 10) -> list:
+    """Estimated top-k tags with intervals; rankConfident when the interval
+    clears the next entry's."""
+    page_counts = [Counter(tag for item in page for tag in item.get(key, [])) for page in pages]
+    names = set().union(*page_counts) if page_counts else set()
+    ranked = sorted(
+        ({"name": name, **estimate_total([c[name] for c in page_counts], weights, total_pages)} for name in names),
+        key=lambda x: -x["estimate"],
+    )
+    top = []
+    for i, entry in enumerate(ranked[:limit]):
+        next_high = ranked[i + 1]["high"] if i + 1 < len(ranked) else 0
+        top.append({
+            "name": entry["name"],
+            "count": entry["estimate"],
+            "low": entry["low"],
+            "high": entry["high"],
+            "rankConfident": entry["low"] is not None and next_high is not None and entry["low"] > next_high,
+        })
+    return top
+
+
+def scrape_approximate(username: str, page_budget: int = APPROX_PAGE_BUDGET, deadline: float = None) -> dict:
+    """Fixed-cost scrape: stratified sample of bookmark/work pages across the
+    whole range, scaled up to estimates with 95% intervals."""
+    print(f"[APPROX] Sampling up to {page_budget} pages for {username}", file=sys.stderr)
+    deadline_at = time.time() + deadline if deadline else None
     
-    return calculate_stats(username, works, bookmarks, profile_stats)
+    profile_stats = scrape_profile_stats(username, deadline_at)
+    if profile_stats is None:
+        return {"error": f"User '{username}' not found"}
+    
+    per_page = 20
+    bookmark_pages = math.ceil(profile_stats.get("bookmarks", 0) / per_page)
+    work_pages = math.ceil(profile_stats.get("works", 0) / per_page)
+    
+    # Split the budget in proportion to each listing's size
+    total = bookmark_pages + work_pages
+    bookmark_budget = min(bookmark_pages, max(1, round(page_budget * bookmark_pages / total))) if bookmark_pages else 0
+    work_budget = min(work_pages, max(1, page_budget - bookmark_budget)) if work_pages else 0
+    
+    weights = {}  # (kind, page) -> stratum width
+    for kind, pages, budget in (("BOOKMARKS", bookmark_pages, bookmark_budget), ("WORKS", work_pages, work_budget)):
+        for p, weight in sample_pages(pages, budget):
+            weights[(kind, p)] = weight
+    tasks = [
+        (kind, p, f"https://archiveofourown.org/users/{username}/{kind.lower()}?page={p}")
+        for kind, p in weights
+    ]
+    fetched = fetch_sampled(tasks, deadline_at)
+    
+    bookmark_sample, work_sample = [], []
+    bookmark_weights, work_weights = [], []
+    for (kind, page_num), html in sorted(fetched.items()):
+        if kind == "BOOKMARKS":
+            bookmark_sample.append(parse_page(html, "bookmarks"))
+            bookmark_weights.append(weights[(kind, page_num)])
+        else:
+            work_sample.append(parse_page(html, "works"))
+            work_weights.append(weights[(kind, page_num)])
+    
+    bookmarks = [b for page in bookmark_sample for b in page]
+    works = [w for page in work_sample for w in page]
+    result = calculate_stats(username, works, bookmarks, profile_stats)
+    
+    def page_sums(pages, field):
+        return [sum(item.get(field, 0) for item in page) for page in pages]
+    
+    words_read = estimate_total(page_sums(bookmark_sample, "words"), bookmark_weights, bookmark_pages)
+    words_written = estimate_total(page_sums(work_sample, "words"), work_weights, work_pages)
+    kudos = estimate_total(page_sums(work_sample, "kudos"), work_weights, work_pages)
+    hits = estimate_total(page_sums(work_sample, "hits"), work_weights, work_pages)
+    # Same sources as calculate_stats: bookmarks first, works as fallback
+    if bookmarks:
+        tag_source, tag_weights, tag_pages = bookmark_sample, bookmark_weights, bookmark_pages
+    else:
+        tag_source, tag_weights, tag_pages = work_sample, work_weights, work_pages
+    
+    result.update({
+        "topFandoms": estimate_top(tag_source, tag_weights, "fandoms", tag_pages),
+        "topRelationships": estimate_top(tag_source, tag_weights, "relationships", tag_pages),
+        "topCharacters": estimate_top(work_sample, work_weights, "characters", work_pages),
+        # Headline numbers stay numeric; estimate.* says whether they are usable
+        "totalWordsRead": words_read["estimate"] or 0,
+        "totalWordsWritten": words_written["estimate"] or 0,
+        "totalKudos": kudos["estimate"] or 0,
+        "totalHits": hits["estimate"] or 0,
+        "isApproximate": True,
+        "estimate": {
+            "confidence": 0.95,
+            "bookmarkPages": {"sampled": len(bookmark_sample), "total": bookmark_pages},
+            "workPages": {"sampled": len(work_sample), "total": work_pages},
+            "totalWordsRead": words_read,
+            "totalWordsWritten": words_written,
+            "totalKudos": kudos,
+            "totalHits": hits,
+        },
+    })
+    return result
+
+
+def flag_value(argv: list, name: str):
+    for i, arg in enumerate(argv):
+        if arg.startswith(f"{name}="):
+            return arg.split("=", 1)[1]
+        if arg == name and i + 1 < len(argv):
+            return argv[i + 1]
+    return None
 
 
 if __name__ == "__main__":
@@ -424,17 +692,35 @@ if __name__ == "__main__":
     
     username = sys.argv[1]
     quick_mode = "--quick" in sys.argv
+    use_store = "--no-store" not in sys.argv
+    refresh = "--refresh" in sys.argv  # Background revalidation: scrape and overwrite the stored result
+    # Approximate mode: --budget-pages N and/or --deadline SECONDS
+    budget_pages = flag_value(sys.argv, "--budget-pages")
+    deadline = flag_value(sys.argv, "--deadline")
+    approx_mode = not quick_mode and (budget_pages is not None or deadline is not None)
+    
+    if quick_mode:
+        mode, scrape = "quick", lambda: scrape_quick(username)
+    elif approx_mode:
+        page_budget = int(budget_pages) if budget_pages else APPROX_PAGE_BUDGET
+        deadline_s = float(deadline) if deadline else None
+        # Each budget/deadline is its own stored result (and refreshes with its own flags)
+        mode = f"approx-{page_budget}p" + (f"-{deadline_s:g}s" if deadline_s else "")
+        scrape = lambda: scrape_approximate(username, page_budget, deadline_s)
+    else:
+        mode, scrape = "full", lambda: scrape_full(username)
     
     print(f"[MAIN] ========================================", file=sys.stderr)
-    print(f"[MAIN] {'QUICK' if quick_mode else 'FULL (parallel)'} scrape: \"{username}\"", file=sys.stderr)
+    print(f"[MAIN] {mode.upper()} scrape: \"{username}\"", file=sys.stderr)
     print(f"[MAIN] ========================================", file=sys.stderr)
     
     start_time = time.time()
     
-    if quick_mode:
-        result = scrape_quick(username)
+    if use_store:
+        command = [__file__] + [arg for arg in sys.argv[1:] if arg != "--refresh"]
+        result = result_store.serve(username, mode, scrape, command, refresh)
     else:
-        result = scrape_full(username)
+        result = scrape()
     
     elapsed = time.time() - start_time
     print(f"[MAIN] Completed in {elapsed:.1f}s", file=sys.stderr)
@@ -0,0 +1,251 @@
+"""
+Quick-mode fast path: dashboard counts + joined date.
+Imports only the HTTP transport and result store (no bs4, no thread pools).
+Pages are tokenized as they stream in and parsing stops as soon as the
+needed elements have been seen, instead of building full parse trees; the
+rest of the body is only drained so the connection can be reused.
+"""
+import codecs
+import json
+import re
+import sys
+import time
+from html.parser import HTMLParser
+
+import ao3_http
+import result_store
+
+CHUNK_SIZE = 8192
+DRAIN_LIMIT = 512 * 1024  # After an early stop, read up to this much of the rest so the connection is reused
+COUNT_LABELS = ("Works", "Bookmarks", "Series", "Collections", "Gifts")
+JOINED_BLOCK_CLASSES = {"meta", "profile", "stats"}
+
+
+class _Done(Exception):
+    """Raised from a handler once everything needed has been seen."""
+
+
+class DashboardParser(HTMLParser):
+    """Collects the "(N)" counts from links in #dashboard, stopping when it closes."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.counts = {label.lower(): 0 for label in COUNT_LABELS}
+        self.found = False
+        self.div_depth = 0  # Open divs inside #dashboard (0 = outside)
+        self.link_text = None
+
+    def handle_starttag(self, tag, attrs):
+        if self.div_depth:
+            if tag == "div":
+                self.div_depth += 1
+            elif tag == "a":
+                self.link_text = []
+        elif tag == "div" and dict(attrs).get("id") == "dashboard":
+            self.found = True
+            self.div_depth = 1
+
+    def handle_endtag(self, tag):
+        if not self.div_depth:
+            return
+        if tag == "a" and self.link_text is not None:
+            self.add_link("".join(self.link_text).strip())
+            self.link_text = None
+        elif tag == "div":
+            self.div_depth -= 1
+            if not self.div_depth:
+                raise _Done()
+
+    def handle_data(self, data):
+        if self.link_text is not None:
+            self.link_text.append(data)
+
+    def add_link(self, text):
+        # Same matching as the full parser in ao3_profile_scraper
+        match = re.search(r'\((\d+)\)', text)
+        if not match:
+            return
+        for label in COUNT_LABELS:
+            if label in text:
+                self.counts[label.lower()] = int(match.group(1))
+                break
+
+
+class JoinedParser(HTMLParser):
+    """Finds the joined date with the same precedence as the full parser:
+    a "joined" <dt> in dl.meta/profile/stats, else the first time[datetime],
+    else the first date-like <dd> inside any <dl>."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.joined = ""
+        self.time_fallback = ""
+        self.dd_fallback = ""
+        self.dl_stack = []  # True for dl.meta/profile/stats
+        self.capture = None  # (kind, fragments, is_joined_dd) for the open dt/dd
+        self.time_capture = None  # (fragments, datetime attr) for the first time[datetime]
+        self.want_dd = False
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "dl":
+            self.dl_stack.append(bool(JOINED_BLOCK_CLASSES & set((attrs.get("class") or "").split())))
+        elif tag == "dt" and any(self.dl_stack):
+            self.capture = ("dt", [], None)
+        elif tag == "dd" and self.dl_stack:
+            self.capture = ("dd", [], self.want_dd)
+            self.want_dd = False
+        if tag == "time" and "datetime" in attrs and not self.time_fallback and self.time_capture is None:
+            self.time_capture = ([], (attrs.get("datetime") or "").strip())
+
+    def handle_endtag(self, tag):
+        if tag == "dl" and self.dl_stack:
+            self.dl_stack.pop()
+            self.want_dd = False
+            return
+        if tag == "time" and self.time_capture is not None:
+            fragments, datetime_attr = self.time_capture
+            self.time_capture = None
+            self.time_fallback = "".join(f.strip() for f in fragments) or datetime_attr
+            return
+        if self.capture is None or tag != self.capture[0]:
+            return
+        kind, fragments, extra = self.capture
+        self.capture = None
+        # Mirrors BeautifulSoup get_text(strip=True)
+        text = "".join(f.strip() for f in fragments)
+        if kind == "dt":
+            label = text.lower().rstrip(":")
+            self.want_dd = "joined" in label or "i joined on" in label
+        elif kind == "dd":
+            if extra and text:
+                self.joined = text
+                raise _Done()
+            if not self.dd_fallback and text and any(ch.isdigit() for ch in text) and "-" in text:
+                self.dd_fallback = text
+
+    def handle_data(self, data):
+        if self.capture is not None:
+            self.capture[1].append(data)
+        if self.time_capture is not None:
+            self.time_capture[0].append(data)
+
+    def result(self) -> str:
+        return self.joined or self.time_fallback or self.dd_fallback
+
+
+def drain(chunks) -> None:
+    """Read (without parsing) what is left of a body, up to DRAIN_LIMIT.
+
+    A fully read response hands its keep-alive connection back to the pool;
+    closing it half-read drops the connection, and the next request pays a
+    new TCP + TLS handshake.
+    """
+    remaining = DRAIN_LIMIT
+    for chunk in chunks:
+        remaining -= len(chunk)
+        if remaining < 0:
+            return
+
+
+def stream_parse(response, parser: HTMLParser) -> HTMLParser:
+    """Feed the body to `parser` chunk by chunk until it signals it is done."""
+    decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")(errors="replace")
+    chunks = response.iter_content(chunk_size=CHUNK_SIZE)
+    try:
+        for chunk in chunks:
+            parser.feed(decoder.decode(chunk))
+        parser.feed(decoder.decode(b"", final=True))
+        parser.close()
+    except _Done:
+        drain(chunks)
+    finally:
+        response.close()
+    return parser
+
+
+def fetch_profile_stats(username: str) -> dict:
+    """Dashboard counts + joined date, or None if the user does not exist."""
+    url = f"https://archiveofourown.org/users/{username}"
+    print(f"[QUICK] Fetching dashboard: {url}", file=sys.stderr)
+
+    stats = {"works": 0, "bookmarks": 0, "series": 0, "collections": 0, "gifts": 0, "joined": ""}
+
+    response = ao3_http.fetch(url, tag="QUICK", stream=True)
+    if response is not None and response.status_code == 404:
+        response.close()
+        return None
+    if response is not None and response.status_code == 200:
+        dashboard = stream_parse(response, DashboardParser())
+        stats.update(dashboard.counts)
+        print(f"[QUICK] Found: works={stats['works']}, bookmarks={stats['bookmarks']}", file=sys.stderr)
+    elif response is not None:
+        response.close()
+
+    profile_url = f"https://archiveofourown.org/users/{username}/profile"
+    try:
+        profile_resp = ao3_http.fetch(profile_url, tag="QUICK", stream=True)
+        if profile_resp is not None and profile_resp.status_code == 200:
+            stats["joined"] = stream_parse(profile_resp, JoinedParser()).result()
+            print(f"[QUICK] Joined parsed: {stats['joined'] or '(not found)'}", file=sys.stderr)
+        elif profile_resp is not None:
+            profile_resp.close()
+    except ao3_http.RequestBudgetExceeded:
+        raise
+    except Exception as e:
+        print(f"[QUICK] Joined parse error: {e}", file=sys.stderr)
+
+    return stats
+
+
+def scrape_quick(username: str) -> dict:
+    """Quick scrape - just dashboard stats, instant."""
+    profile_stats = fetch_profile_stats(username)
+
+    if profile_stats is None:
+        return {"error": f"User '{username}' not found"}
+
+    return {
+        "username": username,
+        "url": f"https://archiveofourown.org/users/{username}",
+        "icon": "",
+        "header": "",
+        "joined": profile_stats.get("joined", ""),
+        "bio": None,
+        "bioHtml": None,
+        "works": profile_stats.get("works", 0),
+        "series": profile_stats.get("series", 0),
+        "bookmarks": profile_stats.get("bookmarks", 0),
+        "collections": profile_stats.get("collections", 0),
+        "gifts": profile_stats.get("gifts", 0),
+        "topFandoms": [],
+        "topCharacters": [],
+        "topRelationships": [],
+        "totalWordsRead": 0,
+        "totalWordsWritten": 0,
+        "totalKudos": 0,
+        "totalHits": 0,
+        "mostPopularWork": None,
+        "isQuickData": True,
+    }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(json.dumps({"error": "No username provided"}))
+        sys.exit(1)
+
+    username = sys.argv[1]
+    use_store = "--no-store" not in sys.argv
+    refresh = "--refresh" in sys.argv
+
+    print(f"[MAIN] QUICK scrape: \"{username}\"", file=sys.stderr)
+    start_time = time.time()
+
+    if use_store:
+        result = result_store.serve(username, "quick", lambda: scrape_quick(username), [__file__, username], refresh)
+    else:
+        result = scrape_quick(username)
+
+    print(f"[MAIN] Completed in {time.time() - start_time:.1f}s", file=sys.stderr)
+    print(json.dumps(result))
@@ -1,35 +1,19 @@
 import json
 import sys
-import time
 from typing import Dict, List
 
-import requests
 from bs4 import BeautifulSoup
 
-BASE = "https://archiveofourown.org"
-
-HEADERS = {
-    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-    "Accept-Language": "en-US,en;q=0.8",
-    "Referer": BASE + "/",
-}
-
-
-def fetch_html(url: str, retries: int = 1, backoff: float = 1.0) -> str:
-    last_err = None
-    for i in range(retries + 1):
-        try:
-            resp = requests.get(url, headers=HEADERS, timeout=8)
-            if resp.status_code == 429:
-                time.sleep(backoff * (i + 1))
-                continue
-            resp.raise_for_status()
-            return resp.text
-        except Exception as e:
-            last_err = e
-            time.sleep(backoff * (i + 1))
-    raise last_err
+import ao3_http
+from ao3_http import BASE
+
+
+def fetch_html(url: str, retries: int = 1) -> str:
+    resp = ao3_http.fetch(url, attempts=retries + 1, timeout=8, tag="FETCH")
+    if resp is None:
+        raise ConnectionError(f"Failed to fetch {url}")
+    resp.raise_for_status()
+    return resp.text
 
 
 def parse_dashboard_count(soup: BeautifulSoup, label: str) -> int:
@@ -0,0 +1,275 @@
+"""
+Benchmarks for index build, local lookups and stats aggregation at archive scale.
+Generates synthetic works with Zipf-skewed authors and tags, times each stage
+in a fresh process per dataset size, and saves or compares JSON baselines.
+Timings come from a pass with no tracing. Per-stage memory (the tracemalloc
+peak of Python allocations, reset before each stage) comes from a second,
+slower pass in its own process; --no-memory skips it. The process-wide max
+RSS of the timing pass is reported separately.
+
+    python server/benchmark.py --sizes 1000,100000 --save bench_baseline.json
+    python server/benchmark.py --sizes 1000,100000 --compare bench_baseline.json --threshold 0.25
+"""
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from itertools import accumulate, islice
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows: no peak RSS
+    resource = None
+
+DEFAULT_SIZES = "1000,10000,100000"  # Up to 10_000_000 for archive scale
+THRESHOLD = 0.25  # Flag stages more than 25% slower/larger than the baseline
+MIN_SECONDS = 0.05  # Timings below this are too noisy to compare
+SEED = 2025
+LOOKUPS = 200  # Per-user lookups timed per size
+EXTRACT_SAMPLE = 100_000  # Rows timed through extract_work on their own
+AGGREGATE_MAX = 1_000_000  # Records fed to calculate_stats
+
+ZIPF_S = 1.1
+FANDOMS = 20_000
+RELATIONSHIPS = 100_000
+CHARACTERS = 60_000
+YEARS = list(range(2009, 2026))
+
+
+def zipf_cum_weights(n: int, s: float = ZIPF_S) -> list:
+    return list(accumulate(1 / (k ** s) for k in range(1, n + 1)))
+
+
+def synthetic_rows(n: int, seed: int = SEED):
+    """Dataset rows in the shape build_index.extract_work expects, with
+    Zipf-distributed authors (a few prolific) and tags (a few huge fandoms)."""
+    rng = random.Random(seed)
+    authors = max(10, n // 8)
+    author_cw = zipf_cum_weights(authors)
+    fandom_cw = zipf_cum_weights(FANDOMS)
+    relationship_cw = zipf_cum_weights(RELATIONSHIPS)
+    character_cw = zipf_cum_weights(CHARACTERS)
+
+    def tags(prefix, cum_weights, k):
+        return [f"{prefix} {t}" for t in rng.choices(range(len(cum_weights)), cum_weights=cum_weights, k=k)]
+
+    for i in range(n):
+        author = rng.choices(range(authors), cum_weights=author_cw)[0]
+        published = rng.choice(YEARS)
+        updated = rng.randint(published, YEARS[-1])
+        yield {
+            "id": str(i),
+            "title": f"Work {i}",
+            "metadata": {
+                "author": f"by author{author}",
+                "words": f"{int(rng.lognormvariate(8.5, 1.2)):,}",
+                "Fandom": tags("Fandom", fandom_cw, rng.randint(1, 2)),
+                "Relationship": tags("Relationship", relationship_cw, rng.randint(0, 3)),
+                "Character": tags("Character", character_cw, rng.randint(1, 5)),
+                "Rating": rng.choice(["General Audiences", "Teen And Up Audiences", "Mature", "Explicit"]),
+                "Category": rng.choice(["Gen", "F/M", "M/M", "F/F"]),
+                "Published": f"{published}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                "Updated": f"{updated}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            },
+        }
+
+
+def max_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # KiB on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def stage_peak_mb() -> float:
+    """Peak traced memory since the last reset_peak()."""
+    return round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 1)
+
+
+def timed(results: dict, stage: str, fn, **extra):
+    """Run one stage: timings, or only its memory peak while tracemalloc is tracing."""
+    print(f"[BENCH] {stage}...", file=sys.stderr)
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.reset_peak()
+    start = time.perf_counter()
+    with redirect_stdout(sys.stderr):
+        value = fn()
+    elapsed = time.perf_counter() - start
+    results[stage] = {"peakMb": stage_peak_mb()} if tracing else {"seconds": round(elapsed, 4)}
+    results[stage].update(extra)
+    return value
+
+
+def time_lookups(lookup, names: list) -> dict:
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+        for name in names:
+            lookup(name)
+        return {"peakMb": stage_peak_mb()}
+    samples = []
+    for name in names:
+        start = time.perf_counter()
+        lookup(name)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "seconds": round(sum(samples) / 1000, 4),
+        "meanMs": round(sum(samples) / len(samples), 3),
+        "p95Ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+    }
+
+
+def run_worker(n: int, memory: bool = False) -> dict:
+    """All stages for one size; runs in its own process with AO3_DATA_DIR set.
+
+    With memory=True only per-stage memory peaks are recorded (under tracing).
+    """
+    data_dir = Path(os.environ["AO3_DATA_DIR"])
+    import build_index
+    import build_distributions
+    import ao3_local
+
+    if memory:
+        tracemalloc.start()
+    results = {}
+    sample = list(islice(synthetic_rows(n), min(n, EXTRACT_SAMPLE)))
+    timed(results, "extractWork", lambda: [build_index.extract_work(r) for r in sample], rows=len(sample))
+    del sample
+
+    timed(results, "generate", lambda: sum(1 for _ in synthetic_rows(n)), rows=n)
+    # Includes generating the rows; subtract "generate" for the index itself
+    timed(results, "buildIndex", lambda: build_index.build(synthetic_rows(n), data_dir, progress=False), rows=n)
+    timed(results, "buildDistributions", lambda: build_distributions.build(data_dir, progress=False))
+    timed(results, "coldLoad", ao3_local.load_data)
+
+    # Prolific authors (low Zipf ranks) plus a uniform sample of the rest
+    rng = random.Random(SEED)
+    authors = max(10, n // 8)
+    names = [f"author{a}" for a in range(min(10, authors))]
+    names += [f"author{rng.randrange(authors)}" for _ in range(LOOKUPS - len(names))]
+    results["lookup"] = time_lookups(ao3_local.get_user_stats, names)
+    # Per-author read used by hybrid scrapes (no full index load)
+    results["worksLookup"] = time_lookups(ao3_local.get_user_works, names)
+
+    year = YEARS[-1]
+    timed(results, "yearColdLoad", lambda: ao3_local.load_year(year))
+    results["yearLookup"] = time_lookups(lambda name: ao3_local.get_user_stats(name, year), names)
+
+    try:
+        from ao3_profile_scraper import calculate_stats
+    except ImportError as e:
+        print(f"[BENCH] Skipping aggregate: {e}", file=sys.stderr)
+    else:
+        records = list(islice(ao3_local._works.values(), AGGREGATE_MAX))
+        profile = {"works": len(records), "bookmarks": len(records)}
+        timed(results, "aggregate", lambda: calculate_stats("bench", records, records, profile), records=len(records))
+
+    if not memory:
+        # Whole-process high-water mark (includes non-Python allocations such as Arrow buffers)
+        results["process"] = {"maxRssMb": max_rss_mb()}
+    return results
+
+
+def run_pass(n: int, memory: bool) -> dict:
+    with tempfile.TemporaryDirectory(prefix="ao3-bench-") as data_dir:
+        env = dict(os.environ, AO3_DATA_DIR=data_dir)
+        proc = subprocess.run(
+            [sys.executable, __file__, "--worker", str(n)] + (["--memory"] if memory else []),
+            env=env,
+            stdout=subprocess.PIPE,
+            text=True,
+            check=True,
+        )
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def run_size(n: int, memory: bool = True) -> dict:
+    """Timing pass, then (optionally) the traced memory pass, merged per stage."""
+    results = run_pass(n, memory=False)
+    if memory:
+        print(f"[BENCH] Memory pass...", file=sys.stderr)
+        for stage, metrics in run_pass(n, memory=True).items():
+            results.setdefault(stage, {}).update(metrics)
+    return results
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """Stages/metrics that got worse than baseline * (1 + threshold)."""
+    regressions = []
+    for size, stages in current["sizes"].items():
+        for stage, metrics in stages.items():
+            base = baseline.get("sizes", {}).get(size, {}).get(stage)
+            if not base:
+                continue
+            for metric in ("seconds", "meanMs", "p95Ms", "peakMb", "maxRssMb"):
+                old, new = base.get(metric), metrics.get(metric)
+                if old is None or new is None:
+                    continue
+                floor = MIN_SECONDS if metric == "seconds" else 1
+                if old > floor and new > old * (1 + threshold):
+                    regressions.append(f"{size} {stage}.{metric}: {old} -> {new} (+{(new / old - 1) * 100:.0f}%)")
+    return regressions
+
+
+def parse_flag(argv, name, default=None):
+    for i, arg in enumerate(argv):
+        if arg.startswith(f"{name}="):
+            return arg.split("=", 1)[1]
+        if arg == name and i + 1 < len(argv):
+            return argv[i + 1]
+    return default
+
+
+def main():
+    argv = sys.argv[1:]
+    worker = parse_flag(argv, "--worker")
+    if worker:
+        print(json.dumps(run_worker(int(worker), memory="--memory" in argv)))
+        return
+
+    sizes = [int(s) for s in parse_flag(argv, "--sizes", DEFAULT_SIZES).split(",") if s]
+    save_path = parse_flag(argv, "--save")
+    compare_path = parse_flag(argv, "--compare")
+    threshold = float(parse_flag(argv, "--threshold", THRESHOLD))
+    memory = "--no-memory" not in argv
+
+    report = {
+        "createdAt": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "sizes": {},
+    }
+    for n in sizes:
+        print(f"[BENCH] === {n:,} records ===", file=sys.stderr)
+        report["sizes"][str(n)] = run_size(n, memory)
+        for stage, metrics in report["sizes"][str(n)].items():
+            print(f"  {stage:<20} {json.dumps(metrics)}")
+
+    if save_path:
+        with open(save_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved baseline to {save_path}")
+
+    if compare_path:
+        with open(compare_path, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, threshold)
+        if regressions:
+            print(f"Regressions beyond {threshold * 100:.0f}%:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"No regressions beyond {threshold * 100:.0f}% against {compare_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Precompute per-tag distributions of works/words per author for percentile stats.
+Reads the output of build_index.py; run after it:
+    python server/build_distributions.py [--year 2025]
+"""
+import json
+import os
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+from tqdm import tqdm
+
+DATA_DIR = Path(os.getenv("AO3_DATA_DIR", str(Path(__file__).parent / "data")))
+INDEX_FILE = DATA_DIR / "author_index.json"
+WORKS_FILE = DATA_DIR / "works.jsonl"
+YEARS_DIR = DATA_DIR / "years"
+DISTRIBUTIONS_FILE = "tag_distributions.json"
+
+QUANTILES = int(os.getenv("AO3_DIST_QUANTILES", "100"))  # points stored per tag = QUANTILES + 1
+MIN_AUTHORS = int(os.getenv("AO3_DIST_MIN_AUTHORS", "20"))  # smaller tags are too noisy to rank
+TAG_KINDS = ("fandoms", "relationships", "characters")
+
+def quantile_points(values):
+    """Compact sketch: nearest-rank value at every 1/QUANTILES step."""
+    values = sorted(values)
+    last = len(values) - 1
+    return [values[round(q * last / QUANTILES)] for q in range(QUANTILES + 1)]
+
+def summarize(per_tag):
+    """tag -> {"authors", "works": points, "words": points}, dropping small tags."""
+    out = {}
+    for tag, per_author in per_tag.items():
+        if len(per_author) < MIN_AUTHORS:
+            continue
+        out[tag] = {
+            "authors": len(per_author),
+            "works": quantile_points([w for w, _ in per_author]),
+            "words": quantile_points([words for _, words in per_author]),
+        }
+    return out
+
+def author_tag_totals(index_file, works_file, progress=True):
+    """kind -> tag -> [(works, words) per author] from a build_index output."""
+    with open(index_file, "r", encoding="utf-8") as f:
+        author_index = json.load(f)
+    works = {}
+    with open(works_file, "r", encoding="utf-8") as f:
+        for line in f:
+            work = json.loads(line)
+            works[work.get("id") or ""] = (
+                work.get("words", 0) or 0,
+                {kind: work.get(kind, []) for kind in TAG_KINDS},
+            )
+
+    per_tag = {kind: defaultdict(list) for kind in TAG_KINDS}
+    for work_ids in tqdm(author_index.values(), desc="Aggregating authors", disable=not progress):
+        totals = {kind: defaultdict(lambda: [0, 0]) for kind in TAG_KINDS}
+        for wid in work_ids:
+            if wid not in works:
+                continue
+            words, tags = works[wid]
+            for kind in TAG_KINDS:
+                for tag in set(tags[kind]):
+                    totals[kind][tag][0] += 1
+                    totals[kind][tag][1] += words
+        for kind in TAG_KINDS:
+            for tag, (count, words) in totals[kind].items():
+                per_tag[kind][tag].append((count, words))
+    return per_tag
+
+def parse_flag(argv, name):
+    for i, arg in enumerate(argv):
+        if arg.startswith(f"{name}="):
+            return arg.split("=", 1)[1]
+        if arg == name and i + 1 < len(argv):
+            return argv[i + 1]
+    return None
+
+def build(source_dir, progress=True):
+    """Write tag_distributions.json next to a build_index output."""
+    source_dir = Path(source_dir)
+    print(f"Computing tag distributions from {source_dir}...")
+    per_tag = author_tag_totals(source_dir / INDEX_FILE.name, source_dir / WORKS_FILE.name, progress)
+    distributions = {kind: summarize(per_tag[kind]) for kind in TAG_KINDS}
+
+    output = source_dir / DISTRIBUTIONS_FILE
+    print(f"Saving {sum(len(d) for d in distributions.values())} tag distributions to {output}...")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({"quantiles": QUANTILES, "minAuthors": MIN_AUTHORS, "tags": distributions}, f)
+    return output
+
+def main():
+    year = parse_flag(sys.argv[1:], "--year")
+
+    source_dir = YEARS_DIR / year if year else DATA_DIR
+    if not (source_dir / INDEX_FILE.name).exists() or not (source_dir / WORKS_FILE.name).exists():
+        print(f"Index not found in {source_dir}. Run: python server/build_index.py first.")
+        sys.exit(1)
+
+    build(source_dir)
+    print("Done!")
+
+if __name__ == "__main__":
+    main()
@@ -4,17 +4,24 @@ Run once: python server/build_index.py
 """
 import json
 import os
+import shutil
+import sqlite3
 import sys
 from collections import defaultdict
 from pathlib import Path
 
+import pyarrow as pa
+import pyarrow.compute as pc
 from datasets import load_dataset
 from tqdm import tqdm
 
 DATASET_ID = os.getenv("AO3_DATASET_ID", "trentmkelly/archiveofourown-meta")
-OUTPUT_DIR = Path(__file__).parent / "data"
+OUTPUT_DIR = Path(os.getenv("AO3_DATA_DIR", str(Path(__file__).parent / "data")))
 INDEX_FILE = OUTPUT_DIR / "author_index.json"
 WORKS_FILE = OUTPUT_DIR / "works.jsonl"
+YEARS_DIR = OUTPUT_DIR / "years"  # years/<year>/{author_index.json,works.jsonl}
+AUTHOR_DB = OUTPUT_DIR / "author_works.sqlite"  # author -> work records, for per-author lookups
+DATE_BATCH = int(os.getenv("AO3_DATE_BATCH", "10000"))
 
 def normalize_list(val):
     if val is None:
@@ -54,22 +61,69 @@ def extract_work(row):
         "characters": normalize_list(meta.get("Character") or meta.get("Characters")),
         "rating": meta.get("Rating"),
         "category": meta.get("Category"),
+        # Raw strings here; parsed in batches by add_dates()
+        "published": meta.get("Published"),
+        "updated": meta.get("Updated") or meta.get("Completed") or meta.get("Published"),
     }
 
-def main():
-    print(f"Loading dataset: {DATASET_ID}")
-    print("This will take several minutes on first run...")
-    
-    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-    
-    # Stream and process
-    ds = load_dataset(DATASET_ID, split="train", streaming=True)
+def parse_dates(values):
+    """Parse a batch of date strings in one vectorized pass -> (ISO dates, years)."""
+    arr = pa.array([v.strip() if isinstance(v, str) else None for v in values], type=pa.string())
+    ts = pc.strptime(pc.utf8_slice_codeunits(arr, 0, 10), format="%Y-%m-%d", unit="s", error_is_null=True)
+    dates = pc.cast(ts, pa.date32()).to_pylist()
+    return [d.isoformat() if d else None for d in dates], pc.year(ts).to_pylist()
+
+def add_dates(batch):
+    """Replace raw published/updated strings with ISO dates and set the work's year."""
+    published, published_years = parse_dates([w.get("published") for w in batch])
+    updated, updated_years = parse_dates([w.get("updated") for w in batch])
+    for i, work in enumerate(batch):
+        work["published"] = published[i]
+        work["updated"] = updated[i]
+        work["year"] = updated_years[i] or published_years[i]
+
+def save_partition(directory, author_index, works, work_ids):
+    directory.mkdir(parents=True, exist_ok=True)
+    with open(directory / "works.jsonl", "w", encoding="utf-8") as f:
+        for work_id in work_ids:
+            f.write(json.dumps(works[work_id], default=str) + "\n")
+    with open(directory / "author_index.json", "w", encoding="utf-8") as f:
+        json.dump(author_index, f)
+
+def save_author_db(path, author_index, works):
+    """Work records keyed by author, so one author is read without loading the index."""
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp.unlink(missing_ok=True)
+    conn = sqlite3.connect(str(tmp))
+    conn.execute("CREATE TABLE author_works (author TEXT NOT NULL, data TEXT NOT NULL)")
+    conn.executemany(
+        "INSERT INTO author_works (author, data) VALUES (?, ?)",
+        (
+            (author, json.dumps(works[work_id], default=str))
+            for author, work_ids in author_index.items()
+            for work_id in work_ids
+        ),
+    )
+    conn.execute("CREATE INDEX author_works_author ON author_works (author)")
+    conn.commit()
+    conn.close()
+    os.replace(tmp, path)
+
+def build(rows, output_dir=OUTPUT_DIR, progress=True):
+    """Build the author index, works file and year partitions from dataset rows."""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    index_file = output_dir / INDEX_FILE.name
+    works_file = output_dir / WORKS_FILE.name
+    years_dir = output_dir / YEARS_DIR.name
+    author_db = output_dir / AUTHOR_DB.name
     
     author_index = defaultdict(list)  # author -> [work_ids]
     works = {}  # id -> work data
+    batch = []  # works awaiting date parsing
     
     count = 0
-    for row in tqdm(ds, desc="Processing works"):
+    for row in tqdm(rows, desc="Processing works", disable=not progress):
         work = extract_work(row)
         author = work.get("author")
         work_id = work.get("id") or str(count)
@@ -78,25 +132,64 @@ def main():
             author_index[author].append(work_id)
         
         works[work_id] = work
+        batch.append(work)
         count += 1
         
+        if len(batch) >= DATE_BATCH:
+            add_dates(batch)
+            batch = []
+        
         # Progress checkpoint every 100k
-        if count % 100000 == 0:
+        if progress and count % 100000 == 0:
             print(f"Processed {count} works, {len(author_index)} unique authors...")
     
+    if batch:
+        add_dates(batch)
+    
     print(f"\nTotal: {count} works, {len(author_index)} authors")
     
     # Save works as JSONL
-    print(f"Saving works to {WORKS_FILE}...")
-    with open(WORKS_FILE, "w", encoding="utf-8") as f:
+    print(f"Saving works to {works_file}...")
+    with open(works_file, "w", encoding="utf-8") as f:
         for work_id, work in works.items():
             f.write(json.dumps(work, default=str) + "\n")
     
     # Save author index
-    print(f"Saving author index to {INDEX_FILE}...")
-    with open(INDEX_FILE, "w", encoding="utf-8") as f:
+    print(f"Saving author index to {index_file}...")
+    with open(index_file, "w", encoding="utf-8") as f:
         json.dump(dict(author_index), f)
     
+    print(f"Saving per-author lookup to {author_db}...")
+    save_author_db(author_db, author_index, works)
+    
+    # Partition works and author postings by year for year-scoped lookups
+    year_works = defaultdict(list)  # year -> [work_ids]
+    year_index = defaultdict(lambda: defaultdict(list))  # year -> author -> [work_ids]
+    for author, work_ids in author_index.items():
+        for work_id in work_ids:
+            year = works[work_id].get("year")
+            if year:
+                year_index[year][author].append(work_id)
+    for work_id, work in works.items():
+        if work.get("year"):
+            year_works[work["year"]].append(work_id)
+    
+    print(f"Saving {len(year_works)} year partitions to {years_dir}...")
+    # Drop partitions from a previous build so removed years don't linger
+    shutil.rmtree(years_dir, ignore_errors=True)
+    for year in sorted(year_works):
+        save_partition(years_dir / str(year), dict(year_index[year]), works, year_works[year])
+    
+    return count
+
+def main():
+    print(f"Loading dataset: {DATASET_ID}")
+    print("This will take several minutes on first run...")
+    
+    # Stream and process
+    ds = load_dataset(DATASET_ID, split="train", streaming=True)
+    build(ds)
+    
     print("Done! You can now run the server for instant lookups.")
 
 if __name__ == "__main__":
@@ -0,0 +1,102 @@
+"""
+Resumable progress for full scrapes.
+scrape_full records every parsed page under a per-user job ID, so a run that
+is killed (e.g. by the Node SCRAPE_TIMEOUT_MS) resumes where it stopped
+instead of starting again from page 1.
+"""
+import hashlib
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional
+
+CHECKPOINT_DIR = Path(os.getenv("AO3_CHECKPOINT_DIR", str(Path(__file__).parent / "data" / "checkpoints")))
+CHECKPOINT_TTL = int(os.getenv("AO3_CHECKPOINT_TTL_S", str(24 * 3600)))  # Older checkpoints are garbage-collected
+SAVE_INTERVAL = 5  # Seconds between writes while pages are arriving
+
+
+def job_id(username: str) -> str:
+    return hashlib.sha1(f"full:{username.strip().lower()}".encode("utf-8")).hexdigest()[:16]
+
+
+def checkpoint_path(username: str) -> Path:
+    return CHECKPOINT_DIR / f"{job_id(username)}.json"
+
+
+def load(username: str) -> dict:
+    """The saved job for this user, or a fresh one."""
+    path = checkpoint_path(username)
+    if path.exists() and time.time() - path.stat().st_mtime < CHECKPOINT_TTL:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            print(f"[CHECKPOINT] Resuming job {job_id(username)}", file=sys.stderr)
+            state["_savedAt"] = time.time()
+            return state
+        except (OSError, ValueError) as e:
+            print(f"[CHECKPOINT] Ignoring unreadable checkpoint: {e}", file=sys.stderr)
+    return {"jobId": job_id(username), "username": username, "createdAt": time.time(), "kinds": {}, "_savedAt": 0}
+
+
+def start_kind(state: dict, kind: str, total_pages: int, total_items: int) -> None:
+    """Begin (or resume) a listing.
+
+    Listings are ordered by recency, so one new bookmark/work shifts records
+    across page boundaries: saved pages are dropped whenever the dashboard
+    count (`total_items`) or page count differs from the saved run's.
+    """
+    entry = state["kinds"].get(kind)
+    if not entry or entry.get("totalPages") != total_pages or entry.get("totalItems") != total_items:
+        state["kinds"][kind] = {
+            "totalPages": total_pages,
+            "totalItems": total_items,
+            "pages": {},
+            "pending": list(range(1, total_pages + 1)),
+        }
+
+
+def saved_page(state: dict, kind: str, page: int) -> Optional[List[dict]]:
+    return state["kinds"].get(kind, {}).get("pages", {}).get(str(page))
+
+
+def record_page(state: dict, kind: str, page: int, records: List[dict]) -> None:
+    """Keep a parsed page and write the checkpoint if SAVE_INTERVAL has passed."""
+    entry = state["kinds"][kind]
+    entry["pages"][str(page)] = records
+    entry["pending"] = [p for p in entry["pending"] if p != page]
+    if time.time() - state["_savedAt"] >= SAVE_INTERVAL:
+        save(state)
+
+
+def save(state: dict) -> None:
+    """Atomically write the checkpoint (temp file + rename)."""
+    CHECKPOINT_DIR.mkdir(parents=True, exist_ok=True)
+    path = checkpoint_path(state["username"])
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    state["_savedAt"] = time.time()
+    state["updatedAt"] = state["_savedAt"]
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({k: v for k, v in state.items() if not k.startswith("_")}, f)
+    os.replace(tmp, path)
+
+
+def clear(username: str) -> None:
+    try:
+        checkpoint_path(username).unlink()
+    except FileNotFoundError:
+        pass
+
+
+def gc() -> None:
+    """Remove checkpoints (and stray temp files) older than CHECKPOINT_TTL."""
+    if not CHECKPOINT_DIR.exists():
+        return
+    cutoff = time.time() - CHECKPOINT_TTL
+    for path in CHECKPOINT_DIR.iterdir():
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+        except OSError:
+            pass
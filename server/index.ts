@@ -21,6 +21,8 @@ const inProgressScrapes = new Map<string, Promise<any>>();
 
 const pythonExe = process.env.AO3_PYTHON || path.join(process.cwd(), '.venv', 'Scripts', 'python.exe');
 const scraperPath = path.join(process.cwd(), 'server', 'ao3_profile_scraper.py');
+// Quick lookups use a lightweight entry point (streaming parse, minimal imports)
+const quickScraperPath = path.join(process.cwd(), 'server', 'ao3_quick.py');
 const SCRAPE_TIMEOUT_MS = Number(process.env.AO3_TIMEOUT_MS || 300000); // 5 min for full profile scrape
 
 const runPythonScraper = (username: string, mode: 'quick' | 'full' = 'full') => new Promise((resolve, reject) => {
@@ -30,16 +32,14 @@ const runPythonScraper = (username: string, mode: 'quick' | 'full' = 'full') =>
         return reject(new Error(`Python not found at ${pythonExe}`));
     }
     
-    console.log(`[SPAWN] Checking scraper at: ${scraperPath}`);
-    if (!fs.existsSync(scraperPath)) {
+    const script = mode === 'quick' ? quickScraperPath : scraperPath;
+    console.log(`[SPAWN] Checking scraper at: ${script}`);
+    if (!fs.existsSync(script)) {
         console.error(`[SPAWN] Scraper NOT FOUND!`);
-        return reject(new Error(`Scraper not found at ${scraperPath}`));
+        return reject(new Error(`Scraper not found at ${script}`));
     }
 
-    const args = [scraperPath, username];
-    if (mode === 'quick') {
-        args.push('--quick');
-    }
+    const args = [script, username];
     
     console.log(`[SPAWN] Spawning: ${pythonExe} ${args.join(' ')}`);
     const proc = spawn(pythonExe, args, {
@@ -90,12 +90,36 @@ const runPythonScraper = (username: string, mode: 'quick' | 'full' = 'full') =>
     });
 });
 
+// Views (cache hits included) for the prefetch daemon, which folds this log into its popularity scores
+const accessLogPath = process.env.AO3_ACCESS_LOG || path.join(process.cwd(), 'server', 'data', 'access.jsonl');
+const ACCESS_DEBOUNCE_MS = 60 * 1000; // Username check + page load of one visit count once
+const lastLogged = new Map<string, number>();
+
+const recordAccess = (req: express.Request, username: string, shared: boolean) => {
+    const key = `${req.ip}|${username.toLowerCase()}`;
+    const now = Date.now();
+    if (now - (lastLogged.get(key) ?? 0) < ACCESS_DEBOUNCE_MS) return;
+    lastLogged.set(key, now);
+    if (lastLogged.size > 10000) {
+        for (const [k, at] of lastLogged) {
+            if (now - at >= ACCESS_DEBOUNCE_MS) lastLogged.delete(k);
+        }
+    }
+
+    const line = JSON.stringify({ username, shared, at: now / 1000 }) + '\n';
+    fs.promises.mkdir(path.dirname(accessLogPath), { recursive: true })
+        .then(() => fs.promises.appendFile(accessLogPath, line))
+        .catch(err => console.error(`[ACCESS] Failed to log view: ${err.message}`));
+};
+
 const hasJoined = (data: any) => Boolean(data && typeof data.joined === 'string' && data.joined.trim().length > 0);
 
 // Quick endpoint - just fetches dashboard stats (instant)
 app.get('/api/user/:username/quick', async (req, res) => {
     const { username } = req.params;
-    console.log(`[QUICK] Request for "${username}"`);
+    const shared = req.query.ref === 'share';
+    console.log(`[QUICK] Request for "${username}"${shared ? ' (shared link)' : ''}`);
+    recordAccess(req, username, shared);
 
     if (
         quickCache.has(username) &&
@@ -154,7 +178,7 @@ app.get('/api/user/:username/details', async (req, res) => {
         }
     }
 
-    // Otherwise start a new full scrape
+    // Otherwise start a new full scrape (the page view was counted by /quick)
     try {
         const data = await runPythonScraper(username, 'full');
         fullCache.set(username, { data, timestamp: Date.now() });
@@ -171,6 +195,7 @@ app.get('/api/user/:username', async (req, res) => {
     console.log(`\n========================================`);
     console.log(`[REQUEST] Received request for username: "${username}"`);
     console.log(`========================================`);
+    recordAccess(req, username, false);
 
     if (
         fullCache.has(username) &&
@@ -0,0 +1,200 @@
+"""
+Parallel Parquet shard scan for per-author dataset lookups.
+Reads the locally cached dataset shards directly and pushes the author/year
+predicates down to column reads, so only matching rows are materialized.
+"""
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Iterator, List, Optional
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+PARQUET_DIR = os.getenv("AO3_PARQUET_DIR", "")
+SCAN_WORKERS = int(os.getenv("AO3_SCAN_WORKERS", str(os.cpu_count() or 1)))
+
+AUTHOR_COLUMNS = ("authors", "author")
+UPDATED_COLUMNS = ("updated", "date_updated", "last_updated")
+ASCII_SPACE_MAX = " "  # Every ASCII whitespace character sorts at or below this
+UNICODE_SPACE_MIN = "\x85"  # Lowest non-ASCII whitespace character (NEL)
+
+
+def find_shards(dataset_id: str) -> List[str]:
+    """Locate locally cached Parquet shards for the train split (no network)."""
+    if PARQUET_DIR:
+        root = Path(PARQUET_DIR)
+    else:
+        try:
+            from huggingface_hub import snapshot_download
+            root = Path(snapshot_download(
+                dataset_id,
+                repo_type="dataset",
+                allow_patterns=["*.parquet", "**/*.parquet"],
+                local_files_only=True,
+            ))
+        except Exception:
+            return []
+
+    if not root.exists():
+        return []
+    shards = sorted(str(p) for p in root.rglob("*.parquet"))
+    train = [p for p in shards if "train" in Path(p).name or f"{os.sep}train{os.sep}" in p]
+    return train or shards
+
+
+def first_column(names: List[str], candidates) -> Optional[str]:
+    for c in candidates:
+        if c in names:
+            return c
+    return None
+
+
+def leaf_index(metadata, column: str) -> Optional[int]:
+    """Index of the Parquet leaf column backing `column` (plain or list<string>)."""
+    for i in range(metadata.num_columns):
+        path = metadata.schema.column(i).path
+        if path == column or path.startswith(column + "."):
+            return i
+    return None
+
+
+def as_text(value: Any) -> Optional[str]:
+    if isinstance(value, bytes):
+        try:
+            return value.decode("utf-8")
+        except UnicodeDecodeError:
+            return None
+    return value if isinstance(value, str) else None
+
+
+def as_year(value: Any) -> Optional[int]:
+    if isinstance(value, (datetime, date)):
+        return value.year
+    text = as_text(value)
+    if text and len(text) >= 5 and text[:4].isdigit() and text[4] == "-":
+        return int(text[:4])
+    return None
+
+
+def author_may_match(stats, username_lower: str) -> bool:
+    """Row-group pruning on min/max statistics for a case-insensitive match.
+
+    For an ASCII name every case variant sorts between its upper- and
+    lower-case forms, so a row group whose [min, max] misses that range
+    cannot contain the author. Statistics are on untrimmed values while
+    author_mask trims, so a bound is only used when no value in the group
+    can start with whitespace on that side of the range.
+    """
+    if stats is None or not stats.has_min_max or not username_lower.isascii():
+        return True
+    lo, hi = as_text(stats.min), as_text(stats.max)
+    if lo is None or hi is None:
+        return True
+    # ASCII whitespace sorts below every name: "  ALICE" can hide under any max
+    if lo[:1] > ASCII_SPACE_MAX and hi < username_lower.upper():
+        return False
+    # Trailing whitespace/suffixes sort after the bare name, so widen the upper bound;
+    # names with leading non-ASCII whitespace sort above it, so only prune when none can exist
+    if hi[:1] < UNICODE_SPACE_MIN and lo > username_lower + "\U0010ffff":
+        return False
+    return True
+
+
+def year_may_match(stats, year: int) -> bool:
+    """Row-group pruning on the updated column; rows with no date always pass."""
+    if year is None or stats is None or not stats.has_min_max:
+        return True
+    if stats.null_count is None or stats.null_count > 0:
+        return True
+    lo, hi = as_year(stats.min), as_year(stats.max)
+    if lo is None or hi is None:
+        return True
+    return lo <= year <= hi
+
+
+def author_mask(column: pa.ChunkedArray, username_lower: str) -> pa.Array:
+    """Boolean mask of rows whose author (or any listed author) matches."""
+    arr = column.combine_chunks() if isinstance(column, pa.ChunkedArray) else column
+    if pa.types.is_list(arr.type) or pa.types.is_large_list(arr.type):
+        flat = pc.list_flatten(arr)
+        parents = pc.list_parent_indices(arr)
+        hits = pc.equal(pc.utf8_lower(pc.utf8_trim_whitespace(pc.cast(flat, pa.string()))), username_lower)
+        matched = pc.unique(pc.filter(parents, pc.fill_null(hits, False)))
+        return pc.is_in(pa.array(range(len(arr)), type=parents.type), value_set=matched)
+    values = pc.utf8_lower(pc.utf8_trim_whitespace(pc.cast(arr, pa.string())))
+    return pc.fill_null(pc.equal(values, username_lower), False)
+
+
+def year_mask(column: pa.ChunkedArray, year: int) -> Optional[pa.Array]:
+    """Conservative year mask: only drops rows `to_year` would also reject."""
+    arr = column.combine_chunks() if isinstance(column, pa.ChunkedArray) else column
+    if pa.types.is_timestamp(arr.type) or pa.types.is_date(arr.type):
+        return pc.fill_null(pc.equal(pc.year(arr), year), True)
+    if pa.types.is_string(arr.type) or pa.types.is_large_string(arr.type):
+        iso_like = pc.fill_null(pc.match_substring_regex(arr, r"^\d{4}-"), False)
+        in_year = pc.fill_null(pc.starts_with(arr, f"{year}-"), False)
+        return pc.or_(pc.invert(iso_like), in_year)
+    # Numeric timestamps are left to the per-row check
+    return None
+
+
+def scan_shard(args) -> List[dict]:
+    """Scan one shard and return only the rows matching author (and year)."""
+    path, username_lower, year = args
+    pf = pq.ParquetFile(path)
+    names = pf.schema_arrow.names
+    author_col = first_column(names, AUTHOR_COLUMNS)
+    if author_col is None:
+        return []
+    updated_col = first_column(names, UPDATED_COLUMNS)
+
+    metadata = pf.metadata
+    author_leaf = leaf_index(metadata, author_col)
+    updated_leaf = leaf_index(metadata, updated_col) if updated_col else None
+
+    rows = []
+    for rg in range(pf.num_row_groups):
+        group = metadata.row_group(rg)
+        if author_leaf is not None and not author_may_match(group.column(author_leaf).statistics, username_lower):
+            continue
+        if updated_leaf is not None and not year_may_match(group.column(updated_leaf).statistics, year):
+            continue
+
+        mask = author_mask(pf.read_row_group(rg, columns=[author_col]).column(0), username_lower)
+        if not pc.any(mask).as_py():
+            continue
+
+        if updated_col and year is not None:
+            ymask = year_mask(pf.read_row_group(rg, columns=[updated_col]).column(0), year)
+            if ymask is not None:
+                mask = pc.and_(mask, ymask)
+                if not pc.any(mask).as_py():
+                    continue
+
+        rows.extend(pf.read_row_group(rg).filter(mask).to_pylist())
+    return rows
+
+
+def scan_author_rows(shards: List[str], username: str, year: Optional[int] = None) -> Iterator[dict]:
+    """Yield matching rows from all shards, in shard order, scanning in parallel."""
+    username_lower = username.lower().strip()
+    tasks = [(path, username_lower, year) for path in shards]
+    workers = max(1, min(SCAN_WORKERS, len(tasks)))
+    print(f"[SCAN] {len(tasks)} shards, {workers} workers", file=sys.stderr)
+
+    if workers == 1:
+        for task in tasks:
+            yield from scan_shard(task)
+        return
+
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        for rows in executor.map(scan_shard, tasks):
+            yield from rows
+    finally:
+        # Stop outstanding shards if the caller stops early (e.g. MAX_MATCHES)
+        executor.shutdown(wait=True, cancel_futures=True)
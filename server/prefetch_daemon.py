@@ -0,0 +1,201 @@
+"""
+Background cache warmer for popular profiles.
+Picks the most requested / most shared usernames from the views the Node
+server logs (result_store.ACCESS_LOG) and re-scrapes them before their stored results go stale, but
+only while the site is quiet and within a global page budget per hour.
+
+    python server/prefetch_daemon.py [--once]
+"""
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import result_store
+
+SERVER_DIR = Path(__file__).parent
+FULL_SCRAPER = SERVER_DIR / "ao3_profile_scraper.py"
+QUICK_SCRAPER = SERVER_DIR / "ao3_quick.py"
+STATE_FILE = Path(os.getenv("AO3_PREFETCH_STATE", str(SERVER_DIR / "data" / "prefetch_state.json")))
+
+INTERVAL = int(os.getenv("AO3_PREFETCH_INTERVAL_S", "60"))  # Seconds between passes
+PAGES_PER_HOUR = int(os.getenv("AO3_PREFETCH_PAGES_PER_HOUR", "300"))  # Global AO3 request budget, retries included
+QUIET_WINDOW = 300  # Seconds of user traffic looked at to decide if the site is quiet
+QUIET_MAX = int(os.getenv("AO3_PREFETCH_QUIET_MAX", "2"))  # Max distinct users in QUIET_WINDOW to count as quiet
+CANDIDATES = int(os.getenv("AO3_PREFETCH_CANDIDATES", "50"))  # Popular users considered per pass
+# A view scores 1 (SHARE_WEIGHT via a shared link) and halves every ACCESS_HALF_LIFE, so a
+# single plain view is always below 1.5; two views within a half-life or one shared view clear it.
+# The Node server logs at most one view per client and user per minute (ACCESS_DEBOUNCE_MS)
+MIN_SCORE = float(os.getenv("AO3_PREFETCH_MIN_SCORE", "1.5"))
+REFRESH_AT = 0.8  # Re-scrape once a stored result is this fraction of FRESH_TTL old
+FAILURE_COOLDOWN = 3600  # Seconds before retrying a user whose prefetch failed
+SCRAPE_TIMEOUT = result_store.REFRESH_TIMEOUT  # --refresh children also stop themselves at this
+PAGE_SIZE = 20  # Works/bookmarks per AO3 listing page
+MAX_PAGES = 50  # Same cap as ao3_profile_scraper.MAX_PAGES
+QUICK_PAGES = 2  # Dashboard + profile
+
+
+def load_state() -> dict:
+    try:
+        with open(STATE_FILE, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        state = {}
+    cutoff = time.time() - 3600
+    return {
+        "spent": [entry for entry in state.get("spent", []) if entry[0] > cutoff],
+        "failures": {user: at for user, at in state.get("failures", {}).items() if at > time.time() - FAILURE_COOLDOWN},
+    }
+
+
+def save_state(state: dict) -> None:
+    """Atomically write the state (temp file + rename)."""
+    STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp = STATE_FILE.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp, STATE_FILE)
+
+
+def pages_left(state: dict) -> int:
+    """Budget remaining in the sliding one-hour window."""
+    cutoff = time.time() - 3600
+    return PAGES_PER_HOUR - sum(pages for at, pages in state["spent"] if at > cutoff)
+
+
+def estimate_pages(username: str) -> int:
+    """AO3 requests a full + quick refresh should cost, from the last stored counts.
+
+    Only used to decide whether to start: the children are hard-capped at
+    the remaining budget and charged what they actually request. Users
+    without a stored result are assumed to hit the page cap.
+    """
+    stored = result_store.peek(username, "full") or result_store.peek(username, "quick")
+    if not stored:
+        return 2 * MAX_PAGES + QUICK_PAGES * 2
+    data = stored["data"]
+    listing = sum(min(math.ceil((data.get(kind) or 0) / PAGE_SIZE), MAX_PAGES) for kind in ("bookmarks", "works"))
+    return listing + QUICK_PAGES * 2  # The full scrape reads the dashboard too
+
+
+def needs_refresh(username: str) -> bool:
+    stored = result_store.peek(username, "full")
+    return stored is None or stored["age"] > result_store.FRESH_TTL * REFRESH_AT
+
+
+def run_capped(script: Path, username: str, cap: int) -> tuple:
+    """Run one `--refresh` scrape limited to `cap` AO3 requests.
+
+    Returns (ok, requests actually made). The child stops (and stores
+    nothing) when the cap is hit; if it is killed before reporting, the
+    whole cap is charged.
+    """
+    fd, count_file = tempfile.mkstemp(prefix="ao3-prefetch-", suffix=".count")
+    os.close(fd)
+    env = dict(os.environ, AO3_REQUEST_BUDGET=str(cap), AO3_REQUEST_COUNT_FILE=count_file)
+    try:
+        proc = subprocess.run(
+            [sys.executable, str(script), username, "--refresh"],
+            env=env,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            timeout=SCRAPE_TIMEOUT,
+        )
+        result = json.loads(proc.stdout.strip().splitlines()[-1]) if proc.stdout.strip() else {}
+        ok = proc.returncode == 0 and bool(result) and not result.get("error")
+        if not ok:
+            print(f"[PREFETCH] {script.name} failed for \"{username}\": {result.get('error', proc.returncode)}", file=sys.stderr)
+    except (subprocess.TimeoutExpired, ValueError) as e:
+        print(f"[PREFETCH] {script.name} failed for \"{username}\": {e}", file=sys.stderr)
+        ok = False
+    try:
+        with open(count_file, "r", encoding="utf-8") as f:
+            used = int(f.read().strip())
+    except (OSError, ValueError):
+        used = cap
+    finally:
+        os.unlink(count_file)
+    return ok, min(used, cap)
+
+
+def refresh(username: str, state: dict) -> bool:
+    """Re-scrape full then quick results within the remaining budget; each
+    script stores its own result. Actual requests are charged to `state`."""
+    ok = True
+    for script in (FULL_SCRAPER, QUICK_SCRAPER):
+        cap = pages_left(state)
+        if cap <= 0:
+            return False
+        script_ok, used = run_capped(script, username, cap)
+        state["spent"].append([time.time(), used])
+        ok = ok and script_ok
+    return ok
+
+
+def busy() -> int:
+    """Distinct users viewed in QUIET_WINDOW, after folding in the latest logged views."""
+    result_store.ingest_access_log()
+    return result_store.recent_activity(QUIET_WINDOW)
+
+
+def run_pass() -> int:
+    """Warm as many popular, soon-stale users as the budget allows. Returns users refreshed."""
+    active = busy()
+    if active > QUIET_MAX:
+        print(f"[PREFETCH] Busy ({active} users in the last {QUIET_WINDOW}s), skipping", file=sys.stderr)
+        return 0
+
+    state = load_state()
+    refreshed = 0
+    for user in result_store.popular_users(CANDIDATES, MIN_SCORE):
+        username = user["username"]
+        if username.lower() in state["failures"] or not needs_refresh(username):
+            continue
+        cost = estimate_pages(username)
+        budget = pages_left(state)
+        if cost > budget:
+            print(f"[PREFETCH] Budget left {budget} < {cost} pages for \"{username}\", skipping", file=sys.stderr)
+            continue  # A cheaper, less popular user may still fit
+        # A user arriving mid-pass takes priority over warming
+        if busy() > QUIET_MAX:
+            print(f"[PREFETCH] Traffic picked up, pausing", file=sys.stderr)
+            break
+        if result_store.peek(username, "full") and not result_store.claim_refresh(username, "full"):
+            continue  # A stale-while-revalidate refresh already owns it
+
+        print(f"[PREFETCH] Warming \"{username}\" (score {user['score']:.1f}, ~{cost} pages)", file=sys.stderr)
+        if refresh(username, state):
+            refreshed += 1
+        elif pages_left(state) > 0:
+            state["failures"][username.lower()] = time.time()
+        save_state(state)
+        if pages_left(state) <= 0:
+            print(f"[PREFETCH] Budget used up", file=sys.stderr)
+            break
+
+    return refreshed
+
+
+def main():
+    once = "--once" in sys.argv
+    print(f"[PREFETCH] Budget {PAGES_PER_HOUR} pages/hour, every {INTERVAL}s", file=sys.stderr)
+    while True:
+        try:
+            refreshed = run_pass()
+            if refreshed:
+                print(f"[PREFETCH] Warmed {refreshed} users", file=sys.stderr)
+        except Exception as e:
+            print(f"[PREFETCH] Pass failed: {e}", file=sys.stderr)
+        if once:
+            break
+        time.sleep(INTERVAL)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+"""
+Durable store for finished scrape results (SQLite).
+Survives server restarts and is shared by every instance on the host.
+Reads are stale-while-revalidate: the last good result is returned at once
+and callers refresh it in the background when it is past FRESH_TTL.
+"""
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, List, Optional
+
+STORE_FILE = Path(os.getenv("AO3_STORE_PATH", str(Path(__file__).parent / "data" / "results.sqlite")))
+RESULT_VERSION = 1  # Bump when the scrape result shape changes; older rows are ignored
+FRESH_TTL = int(os.getenv("AO3_STORE_FRESH_S", "600"))  # Matches the Node CACHE_TTL
+MAX_STALE = int(os.getenv("AO3_STORE_MAX_STALE_S", str(7 * 24 * 3600)))  # Older results are rescraped in the foreground
+MAX_ENTRIES = int(os.getenv("AO3_STORE_MAX_ENTRIES", "5000"))  # Evicted by last access
+REFRESH_TIMEOUT = int(os.getenv("AO3_REFRESH_TIMEOUT_S", "600"))  # Background refreshes are killed after this
+REFRESH_LEASE = REFRESH_TIMEOUT + 60  # Seconds one background refresh owns a key; outlives the refresh itself
+ACCESS_HALF_LIFE = int(os.getenv("AO3_ACCESS_HALF_LIFE_S", str(24 * 3600)))  # Popularity score decay
+SHARE_WEIGHT = 3  # A view from a shared link counts as this many requests
+# Views are appended here by the Node server (one JSON object per line) and folded into the access table
+ACCESS_LOG = Path(os.getenv("AO3_ACCESS_LOG", str(Path(__file__).parent / "data" / "access.jsonl")))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    username TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    refreshing_until REAL NOT NULL DEFAULT 0
+)
+"""
+
+ACCESS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS access (
+    username TEXT PRIMARY KEY,
+    display_name TEXT NOT NULL,
+    requests INTEGER NOT NULL DEFAULT 0,
+    shares INTEGER NOT NULL DEFAULT 0,
+    score REAL NOT NULL DEFAULT 0,
+    last_access REAL NOT NULL
+)
+"""
+
+
+def connect() -> sqlite3.Connection:
+    STORE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(STORE_FILE), timeout=10)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(SCHEMA)
+    conn.execute(ACCESS_SCHEMA)
+    return conn
+
+
+@contextmanager
+def session():
+    """One transaction on a fresh connection, closed afterwards."""
+    conn = connect()
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def make_key(username: str, mode: str) -> str:
+    return f"{mode}:{username.strip().lower()}"
+
+
+def get(username: str, mode: str) -> Optional[dict]:
+    """Last good result as {"data", "age", "stale"}, or None if missing/too old."""
+    now = time.time()
+    key = make_key(username, mode)
+    with session() as conn:
+        row = conn.execute(
+            "SELECT data, created_at FROM results WHERE key = ? AND version = ?",
+            (key, RESULT_VERSION),
+        ).fetchone()
+        if not row:
+            return None
+        age = now - row[1]
+        if age > MAX_STALE:
+            return None
+        conn.execute("UPDATE results SET accessed_at = ?, hits = hits + 1 WHERE key = ?", (now, key))
+    return {"data": json.loads(row[0]), "age": age, "stale": age > FRESH_TTL}
+
+
+def peek(username: str, mode: str) -> Optional[dict]:
+    """Like get() but without counting as an access (for background jobs)."""
+    with session() as conn:
+        row = conn.execute(
+            "SELECT data, created_at FROM results WHERE key = ? AND version = ?",
+            (make_key(username, mode), RESULT_VERSION),
+        ).fetchone()
+    if not row:
+        return None
+    age = time.time() - row[1]
+    return {"data": json.loads(row[0]), "age": age, "stale": age > FRESH_TTL}
+
+
+def decayed(score: float, since: float, now: float) -> float:
+    return score * 0.5 ** (max(0.0, now - since) / ACCESS_HALF_LIFE)
+
+
+def record_access(username: str, shared: bool = False, at: Optional[float] = None) -> None:
+    """Bump the user's popularity score (exponentially decayed, shares weighted)."""
+    with session() as conn:
+        add_access(conn, username, shared, time.time() if at is None else at)
+        trim_access(conn)
+
+
+def add_access(conn: sqlite3.Connection, username: str, shared: bool, at: float) -> None:
+    key = username.strip().lower()
+    row = conn.execute("SELECT score, last_access FROM access WHERE username = ?", (key,)).fetchone()
+    score = (decayed(row[0], row[1], at) if row else 0.0) + (SHARE_WEIGHT if shared else 1)
+    conn.execute(
+        """
+        INSERT INTO access (username, display_name, requests, shares, score, last_access)
+        VALUES (?, ?, 1, ?, ?, ?)
+        ON CONFLICT(username) DO UPDATE SET
+            display_name = excluded.display_name,
+            requests = requests + 1,
+            shares = shares + excluded.shares,
+            score = excluded.score,
+            last_access = MAX(last_access, excluded.last_access)
+        """,
+        (key, username, int(shared), score, at),
+    )
+
+
+def trim_access(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        "DELETE FROM access WHERE username NOT IN (SELECT username FROM access ORDER BY last_access DESC LIMIT ?)",
+        (MAX_ENTRIES,),
+    )
+
+
+def ingest_access_log() -> int:
+    """Fold the views logged by the Node server into the access table. Returns views added.
+
+    The log is renamed before reading so views appended meanwhile start a new
+    file; a batch left over by an interrupted run is picked up next time.
+    """
+    batch = ACCESS_LOG.with_suffix(".ingesting")
+    if not batch.exists():
+        try:
+            os.replace(ACCESS_LOG, batch)
+        except FileNotFoundError:
+            return 0
+    events = []
+    with open(batch, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                event = json.loads(line)
+                events.append((float(event["at"]), str(event["username"]), bool(event.get("shared"))))
+            except (ValueError, KeyError, TypeError):
+                continue  # Torn or malformed line
+    with session() as conn:
+        for at, username, shared in sorted(events):
+            add_access(conn, username, shared, at)
+        trim_access(conn)
+    os.unlink(batch)
+    return len(events)
+
+
+def popular_users(limit: int, min_score: float = 0.0) -> List[dict]:
+    """Most popular usernames by current (decayed) score."""
+    now = time.time()
+    with session() as conn:
+        rows = conn.execute("SELECT display_name, requests, shares, score, last_access FROM access").fetchall()
+    users = [
+        {"username": name, "requests": requests, "shares": shares, "score": decayed(score, last, now), "lastAccess": last}
+        for name, requests, shares, score, last in rows
+    ]
+    users = [u for u in users if u["score"] >= min_score]
+    return sorted(users, key=lambda u: -u["score"])[:limit]
+
+
+def recent_activity(window: float) -> int:
+    """Distinct users requested in the last `window` seconds."""
+    with session() as conn:
+        return conn.execute("SELECT COUNT(*) FROM access WHERE last_access > ?", (time.time() - window,)).fetchone()[0]
+
+
+def put(username: str, mode: str, data: dict) -> None:
+    """Store a finished result (errors are never stored) and enforce the size cap."""
+    if not data or data.get("error"):
+        return
+    now = time.time()
+    with session() as conn:
+        conn.execute(
+            """
+            INSERT INTO results (key, username, mode, version, data, created_at, accessed_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(key) DO UPDATE SET
+                version = excluded.version,
+                data = excluded.data,
+                created_at = excluded.created_at,
+                accessed_at = excluded.accessed_at,
+                refreshing_until = 0
+            """,
+            (make_key(username, mode), username, mode, RESULT_VERSION, json.dumps(data), now, now),
+        )
+        conn.execute(
+            "DELETE FROM results WHERE key NOT IN (SELECT key FROM results ORDER BY accessed_at DESC LIMIT ?)",
+            (MAX_ENTRIES,),
+        )
+
+
+def claim_refresh(username: str, mode: str) -> bool:
+    """Take the refresh lease for a key so only one revalidation runs at a time."""
+    now = time.time()
+    with session() as conn:
+        cur = conn.execute(
+            "UPDATE results SET refreshing_until = ? WHERE key = ? AND refreshing_until < ?",
+            (now + REFRESH_LEASE, make_key(username, mode), now),
+        )
+        return cur.rowcount == 1
+
+
+def spawn_refresh(command: List[str]) -> None:
+    """Revalidate a stale result in a detached `python <command> --refresh` process."""
+    subprocess.Popen(
+        [sys.executable, *command, "--refresh"],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+
+def start_watchdog(seconds: float) -> None:
+    """Hard-exit the process after `seconds`, so a refresh never outlives its lease."""
+    def expire():
+        print(f"[STORE] Refresh exceeded {seconds:.0f}s, exiting", file=sys.stderr)
+        sys.stderr.flush()
+        os._exit(1)
+    timer = threading.Timer(seconds, expire)
+    timer.daemon = True
+    timer.start()
+
+
+def serve(
+    username: str,
+    mode: str,
+    scrape: Callable[[], dict],
+    command: List[str],
+    refresh: bool = False,
+) -> dict:
+    """Stale-while-revalidate read: stored result if any, else scrape and store.
+
+    `command` is the script + arguments that reproduce this scrape; it is
+    re-run with --refresh in the background when the stored copy is stale.
+    Views are counted by the Node server (see ACCESS_LOG), not here.
+    """
+    if refresh:
+        # The lease (taken by whoever started us) must not expire while we run
+        start_watchdog(REFRESH_TIMEOUT)
+    
+    cached = None if refresh else get(username, mode)
+    if cached:
+        print(f"[STORE] Hit ({'stale' if cached['stale'] else 'fresh'}, {cached['age']:.0f}s old)", file=sys.stderr)
+        if cached["stale"] and claim_refresh(username, mode):
+            print(f"[STORE] Refreshing in background", file=sys.stderr)
+            spawn_refresh(command)
+        result = cached["data"]
+        result["cache"] = {"version": RESULT_VERSION, "age": round(cached["age"]), "stale": cached["stale"]}
+        return result
+    
+    result = scrape()
+    put(username, mode, result)
+    return result
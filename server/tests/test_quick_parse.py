@@ -0,0 +1,175 @@
+"""
+The streaming quick-mode parsers (ao3_quick) must extract the same dashboard
+counts and joined date as the BeautifulSoup path in
+ao3_profile_scraper.scrape_profile_stats, however the body is chunked.
+"""
+import http.server
+import socketserver
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import ao3_http  # noqa: E402
+import ao3_profile_scraper  # noqa: E402
+import ao3_quick  # noqa: E402
+
+FIXTURES = Path(__file__).parent / "fixtures"
+CHUNK_SIZES = [1, 3, 17, ao3_quick.CHUNK_SIZE]
+
+# Profile pages for each joined-date fallback in scrape_profile_stats
+PROFILE_VARIANTS = {
+    "meta-dl": (FIXTURES / "profile.html").read_text(encoding="utf-8"),
+    "time-fallback": """
+        <dl class="meta"><dt>My user ID is:</dt><dd>42</dd></dl>
+        <p>Joined <time datetime="2019-07-04T00:00:00Z"> </time> and <time datetime="2020-01-01">later</time></p>
+        <dl><dd>2021-01-01</dd></dl>
+    """,
+    "dd-fallback": """
+        <dl class="meta"><dt>Pseuds:</dt><dd>someone</dd></dl>
+        <dl class="other"><dt>Since</dt><dd>no date here</dd><dd> 2018-11-30 </dd></dl>
+    """,
+    "joined-label-case": """
+        <dl class="stats"><dt> JOINED: </dt><dd><span>2012</span>-<span>05-06</span></dd></dl>
+    """,
+    "not-found": "<div class='profile'><p>Nothing to see</p></div>",
+}
+
+
+class FakeResponse:
+    """Just enough of requests.Response for both parsers."""
+
+    def __init__(self, html: str, chunk_size: int = ao3_quick.CHUNK_SIZE, status_code: int = 200):
+        self.content = html.encode("utf-8")
+        self.text = html
+        self.encoding = "utf-8"
+        self.status_code = status_code
+        self.chunk_size = chunk_size
+        self.closed = False
+
+    def iter_content(self, chunk_size=None):
+        # Ignore the caller's size so tags and multi-byte characters get split
+        for i in range(0, len(self.content), self.chunk_size):
+            yield self.content[i:i + self.chunk_size]
+
+    def close(self):
+        self.closed = True
+
+
+def fake_fetch(pages: dict, chunk_size: int):
+    def fetch(url, *args, **kwargs):
+        kind = "profile" if url.endswith("/profile") else "dashboard"
+        return FakeResponse(pages[kind], chunk_size)
+    return fetch
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+@pytest.mark.parametrize("variant", sorted(PROFILE_VARIANTS))
+def test_profile_stats_match_full_parser(monkeypatch, variant, chunk_size):
+    pages = {
+        "dashboard": (FIXTURES / "dashboard.html").read_text(encoding="utf-8"),
+        "profile": PROFILE_VARIANTS[variant],
+    }
+    monkeypatch.setattr(ao3_http, "fetch", fake_fetch(pages, len(pages["dashboard"]) + len(pages["profile"])))
+    expected = ao3_profile_scraper.scrape_profile_stats("testuser")
+
+    monkeypatch.setattr(ao3_http, "fetch", fake_fetch(pages, chunk_size))
+    assert ao3_quick.fetch_profile_stats("testuser") == expected
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_dashboard_counts(chunk_size):
+    response = FakeResponse((FIXTURES / "dashboard.html").read_text(encoding="utf-8"), chunk_size)
+    parser = ao3_quick.stream_parse(response, ao3_quick.DashboardParser())
+    assert parser.found
+    assert parser.counts == {"works": 45, "bookmarks": 1234, "series": 3, "collections": 7, "gifts": 12}
+    assert response.closed
+
+
+class CountingParser(ao3_quick.DashboardParser):
+    def __init__(self):
+        super().__init__()
+        self.fed = 0
+
+    def feed(self, data):
+        self.fed += len(data)
+        super().feed(data)
+
+
+def counting_chunks(response, consumed: list):
+    chunks = response.iter_content
+    return lambda chunk_size=None: (consumed.append(c) or c for c in chunks())
+
+
+def test_dashboard_stops_parsing_but_drains():
+    html = (FIXTURES / "dashboard.html").read_text(encoding="utf-8")
+    response = FakeResponse(html, 64)
+    consumed = []
+    response.iter_content = counting_chunks(response, consumed)
+    parser = ao3_quick.stream_parse(response, CountingParser())
+    assert parser.fed < len(html)
+    # Read to the end so a real connection would go back to the pool
+    assert sum(map(len, consumed)) == len(response.content)
+
+
+def test_drain_is_bounded(monkeypatch):
+    monkeypatch.setattr(ao3_quick, "DRAIN_LIMIT", 1000)
+    html = (FIXTURES / "dashboard.html").read_text(encoding="utf-8") + "<p>padding</p>" * 10_000
+    response = FakeResponse(html, 256)
+    consumed = []
+    response.iter_content = counting_chunks(response, consumed)
+    ao3_quick.stream_parse(response, ao3_quick.DashboardParser())
+    assert sum(map(len, consumed)) < len(response.content)
+    assert response.closed
+
+
+@pytest.fixture
+def keepalive_server():
+    """Local HTTP/1.1 server serving the fixtures; records client connections."""
+    pages = {
+        "/dashboard": (FIXTURES / "dashboard.html").read_text(encoding="utf-8") + "<p>padding</p>" * 5000,
+        "/profile": (FIXTURES / "profile.html").read_text(encoding="utf-8"),
+    }
+    connections = set()
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            connections.add(self.client_address)
+            body = pages["/profile" if self.path.endswith("/profile") else "/dashboard"].encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    class Server(socketserver.ThreadingTCPServer):
+        daemon_threads = True
+
+    server = Server(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", connections
+    server.shutdown()
+    server.server_close()
+
+
+def test_quick_path_reuses_connection(monkeypatch, keepalive_server):
+    base, connections = keepalive_server
+    real_fetch = ao3_http.fetch
+    monkeypatch.setattr(ao3_http, "fetch", lambda url, *a, **kw: real_fetch(url.replace(ao3_http.BASE, base), *a, **kw))
+    stats = ao3_quick.fetch_profile_stats("testuser")
+    assert stats["works"] == 45 and stats["joined"] == "2015-03-02"
+    assert len(connections) == 1
+
+
+def test_missing_user(monkeypatch):
+    monkeypatch.setattr(ao3_http, "fetch", lambda url, *a, **kw: FakeResponse("Not found", status_code=404))
+    assert ao3_quick.fetch_profile_stats("nobody") is None
+    assert ao3_profile_scraper.scrape_profile_stats("nobody") is None
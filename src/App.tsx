@@ -96,7 +96,9 @@ function UserWrappedPage() {
       setError(null);
       
       try {
-        const quickStats = await fetchUserStatsQuick(username);
+        // Landing straight on a wrapped page (no in-app navigation) means a shared link
+        const fromSharedLink = (window.history.state?.idx ?? 0) === 0;
+        const quickStats = await fetchUserStatsQuick(username, fromSharedLink);
         setStats(quickStats);
       } catch {
         setError('Failed to fetch stats for this user.');
@@ -3,8 +3,9 @@ import type { UserStats, AO3UserProfile } from '../types/ao3';
 const API_BASE = 'http://localhost:3001/api';
 
 // Fetch quick stats (instant - just dashboard counts)
-async function fetchQuickProfile(username: string): Promise<AO3UserProfile> {
-  const response = await fetch(`${API_BASE}/user/${encodeURIComponent(username)}/quick`);
+// `shared` marks visits that arrived through a shared link
+async function fetchQuickProfile(username: string, shared = false): Promise<AO3UserProfile> {
+  const response = await fetch(`${API_BASE}/user/${encodeURIComponent(username)}/quick${shared ? '?ref=share' : ''}`);
   if (!response.ok) {
     const error = await response.json().catch(() => ({}));
     throw new Error(error.details || `Failed to fetch user: ${response.statusText}`);
@@ -43,8 +44,8 @@ function profileToStats(user: AO3UserProfile): UserStats {
 }
 
 // Quick fetch - returns immediately with basic stats
-export async function fetchUserStatsQuick(username: string): Promise<UserStats> {
-  const user = await fetchQuickProfile(username);
+export async function fetchUserStatsQuick(username: string, shared = false): Promise<UserStats> {
+  const user = await fetchQuickProfile(username, shared);
   return profileToStats(user);
 }
 